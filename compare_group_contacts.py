@@ -55,7 +55,7 @@ class WhatsAppGroupComparator:
         """
         # For @s.whatsapp.net format, the phone number is before the @
         if "@s.whatsapp.net" in jid:
-            return jid.split("@")[0]
+            return jid.partition("@")[0]
         
         # For @lid format, we can't extract a phone number
         return None
@@ -168,7 +168,7 @@ class PhoneToJIDConverter:
             contact_name = full_name or push_name or first_name
             
             # Extract phone number from JID
-            phone_from_jid = jid.split('@')[0] if '@' in jid else ""
+            phone_from_jid = jid.partition('@')[0] if '@' in jid else ""
             
             matches.append(ContactMatch(
                 phone_number=phone_from_jid,
@@ -14,13 +14,20 @@ Usage:
 """
 
 import sqlite3
+import atexit
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
-import re
 import sys
+import os
+import functools
+import time
 import argparse
-from typing import List, Dict, Set, Optional, Tuple
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Set, Optional, Tuple, Iterator
+from dataclasses import dataclass, replace
 
 
 @dataclass
@@ -30,22 +37,211 @@ class ContactMatch:
     name: Optional[str] = None
     phone_number: Optional[str] = None
     source: str = ""  # where we found this match
-    groups: List[str] = None  # which groups this contact is in
+    groups: Set[str] = None  # which groups this contact is in
+    source_rank: int = 0  # how trustworthy the name is; higher wins when merging
     
     def __post_init__(self):
-        if self.groups is None:
-            self.groups = []
+        self.groups = set(self.groups or ())
+
+
+class _NonDigitTable(dict):
+    """
+    str.translate table that deletes every non-digit character
+    
+    Entries are filled in on first sight of a code point, so after warm-up
+    digit extraction is a plain C-level table lookup per character.
+    """
+    def __missing__(self, code: int) -> Optional[int]:
+        value = code if chr(code).isdecimal() else None
+        self[code] = value
+        return value
+
+
+_NON_DIGIT_TABLE = _NonDigitTable()
+
+
+@functools.lru_cache(maxsize=4096)
+def _normalize_phone_number(phone: str) -> Tuple[str, ...]:
+    """Memoized implementation of PhoneToJIDLookup.normalize_phone_number"""
+    # Remove all non-digits
+    digits_only = phone.translate(_NON_DIGIT_TABLE)
+    
+    # Generate possible formats
+    formats = [
+        digits_only,  # 972523451451
+        f"+{digits_only}",  # +972523451451
+        f"{digits_only}@s.whatsapp.net",  # 972523451451@s.whatsapp.net
+        f"+{digits_only}@s.whatsapp.net",  # +972523451451@s.whatsapp.net
+    ]
+    
+    # Handle Israeli numbers specifically (remove leading 972, add 0)
+    if digits_only.startswith('972') and len(digits_only) == 12:
+        israeli_format = '0' + digits_only[3:]  # 0523451451
+        formats.extend([
+            israeli_format,
+            f"{israeli_format}@s.whatsapp.net"
+        ])
+    
+    # Remove duplicates while preserving order
+    return tuple(dict.fromkeys(formats))
+
+
+@functools.lru_cache(maxsize=64)
+def _jid_filter_sql(column: str, format_count: int, range_count: int) -> str:
+    """
+    Build the WHERE clause text for PhoneToJIDLookup._jid_filter
+    
+    The text only depends on how many placeholders are needed, so lookups of
+    the same shape produce identical SQL and hit sqlite3's per-connection
+    statement cache instead of preparing the statement again.
+    """
+    clauses = [f"{column} IN ({', '.join('?' * format_count)})"]
+    clauses.extend([f"({column} >= ? AND {column} < ?)"] * range_count)
+    return " OR ".join(clauses)
 
 
 class PhoneToJIDLookup:
+    # Number of group member requests in flight at once
+    HTTP_POOL_SIZE = 16
+    # Seconds a fetched set of group member lists stays valid
+    GROUPS_CACHE_TTL = 300
+    # Most active (sender, chat) pairs returned per phone by the message history search
+    MESSAGE_HISTORY_LIMIT = 100
+    
     def __init__(self, messages_db_path: str = "whatsapp-mcp/whatsapp-bridge/store/messages.db", 
                  contacts_db_path: str = "whatsapp-mcp/whatsapp-bridge/store/whatsapp.db",
-                 api_base_url: str = "http://localhost:8080"):
+                 api_base_url: str = "http://localhost:8080",
+                 explain: bool = False):
         self.messages_db_path = messages_db_path
         self.contacts_db_path = contacts_db_path
         self.api_base_url = api_base_url
+        self.explain = explain  # print EXPLAIN QUERY PLAN for every query (development aid)
+        
+        # One lazily opened connection per database, shared by all searches
+        self._connections: Dict[str, sqlite3.Connection] = {}
+        self._connection_locks: Dict[str, threading.Lock] = {}
+        self._connect_lock = threading.Lock()
+        self._contacts_attached = False
+        atexit.register(self.close)
+        
+        # Keep-alive session sized for the parallel group member fetches
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.HTTP_POOL_SIZE, pool_maxsize=self.HTTP_POOL_SIZE,
+                              max_retries=Retry(total=1))
+        self._http.mount("http://", adapter)
+        self._http.mount("https://", adapter)
+        
+        # Group membership changes rarely, so reuse it across lookups
+        self._groups_cache: Optional[Dict[str, List[str]]] = None
+        self._groups_cache_expiry = 0.0
+        self._member_index: Dict[str, List[Tuple[str, str]]] = {}
+        self._member_index_source: Optional[Dict[str, List[str]]] = None
+        
+    def _get_connection(self, db_path: str) -> sqlite3.Connection:
+        """
+        Get the shared connection for a database, opening it on first use
+        
+        Args:
+            db_path: Path of the database to connect to
+            
+        Returns:
+            Open sqlite3 connection
+        """
+        with self._connect_lock:
+            conn = self._connections.get(db_path)
+            if conn is None:
+                conn = self._open_connection(db_path)
+                self._connections[db_path] = conn
+                self._connection_locks[db_path] = threading.Lock()
+        return conn
+    
+    def _query(self, db_path: str, sql: str, params=()) -> Iterator[tuple]:
+        """
+        Run a query on the shared connection for a database
+        
+        Rows are streamed from the cursor rather than materialized with
+        fetchall(). Searches run concurrently from lookup_phone_number, so
+        the connection stays locked to this thread until the rows are consumed.
+        
+        Args:
+            db_path: Path of the database to query
+            sql: SQL statement
+            params: Statement parameters
+            
+        Yields:
+            Result rows
+        """
+        conn = self._get_connection(db_path)
+        with self._connection_locks[db_path]:
+            if self.explain:
+                for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+                    print(f"   🧭 {row[-1]}")
+            yield from conn.execute(sql, params)
+    
+    def _open_connection(self, db_path: str) -> sqlite3.Connection:
+        """
+        Open a connection and apply the lookup pragmas and indexes
+        
+        Args:
+            db_path: Path of the database to connect to
+            
+        Returns:
+            Open sqlite3 connection
+        """
+        conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=256)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.Error as e:
+            print(f"Warning: Could not enable WAL on {db_path}: {e}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache
+        conn.execute("PRAGMA mmap_size=268435456")  # read pages through a 256 MiB memory map
+        self._ensure_indexes(conn, db_path)
+        
+        # Attach the contacts database to the messages connection so message
+        # senders can be resolved to contact names inside a single query.
+        # ATTACH would silently create a missing file, so check first.
+        if db_path == self.messages_db_path and os.path.exists(self.contacts_db_path):
+            try:
+                conn.execute("ATTACH DATABASE ? AS contacts", (self.contacts_db_path,))
+                self._contacts_attached = True
+            except sqlite3.Error as e:
+                print(f"Warning: Could not attach contacts database: {e}")
+        return conn
+    
+    def close(self):
+        """Close the shared database connections"""
+        with self._connect_lock:
+            for conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+            self._connection_locks.clear()
+        self._http.close()
+    
+    def _ensure_indexes(self, conn: sqlite3.Connection, db_path: str):
+        """
+        Create the JID lookup indexes on a freshly opened connection
         
-    def normalize_phone_number(self, phone: str) -> List[str]:
+        Args:
+            conn: Open connection to the database
+            db_path: Path of the database the connection points at
+        """
+        try:
+            if db_path == self.contacts_db_path:
+                # Covering index: contact searches are answered from the index pages alone
+                conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_contacts_jid_cover
+                    ON whatsmeow_contacts(their_jid COLLATE BINARY, first_name, full_name, push_name)
+                """)
+            elif db_path == self.messages_db_path:
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_sender ON messages(sender)")
+            conn.commit()
+        except sqlite3.Error as e:
+            # Read-only or busy database - lookups still work, just without the index
+            print(f"Warning: Could not create lookup index on {db_path}: {e}")
+    
+    def normalize_phone_number(self, phone: str) -> Tuple[str, ...]:
         """
         Normalize phone number to different possible formats
         
@@ -53,127 +249,215 @@ class PhoneToJIDLookup:
             phone: Input phone number (e.g., "+972523451451", "972523451451")
             
         Returns:
-            List of possible normalized formats to search for
-        """
-        # Remove all non-digits
-        digits_only = re.sub(r'[^\d]', '', phone)
-        
-        # Generate possible formats
-        formats = [
-            digits_only,  # 972523451451
-            f"+{digits_only}",  # +972523451451
-            f"{digits_only}@s.whatsapp.net",  # 972523451451@s.whatsapp.net
-            f"+{digits_only}@s.whatsapp.net",  # +972523451451@s.whatsapp.net
-        ]
-        
-        # Handle Israeli numbers specifically (remove leading 972, add 0)
-        if digits_only.startswith('972') and len(digits_only) == 12:
-            israeli_format = '0' + digits_only[3:]  # 0523451451
-            formats.extend([
-                israeli_format,
-                f"{israeli_format}@s.whatsapp.net"
-            ])
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_formats = []
-        for fmt in formats:
-            if fmt not in seen:
-                seen.add(fmt)
-                unique_formats.append(fmt)
-                
-        return unique_formats
+            Tuple of possible normalized formats to search for
+        """
+        return _normalize_phone_number(phone)
+    
+    def _jid_filter(self, column: str, phone_formats: Tuple[str, ...]) -> Tuple[str, List[str]]:
+        """
+        Build a WHERE clause matching a JID column against phone formats
+        
+        Every format is compared by plain equality in a single IN list. Bare
+        numbers additionally get a "<user>:" .. "<user>;" range so device JIDs
+        ("<user>:<device>@s.whatsapp.net") are found through the index too.
+        
+        Args:
+            column: Name of the JID column to filter on
+            phone_formats: Formats returned by normalize_phone_number
+            
+        Returns:
+            Tuple of (where_clause, params)
+        """
+        params = list(phone_formats)
+        bare_formats = [fmt for fmt in phone_formats if '@' not in fmt]
+        for phone_format in bare_formats:
+            params.extend([f"{phone_format}:", f"{phone_format};"])
+        
+        return _jid_filter_sql(column, len(phone_formats), len(bare_formats)), params
+    
+    def _matched_format(self, jid: str, phone_formats: Tuple[str, ...]) -> Optional[str]:
+        """
+        Work out which phone format a JID returned by _jid_filter matched
+        
+        Args:
+            jid: JID returned by the query
+            phone_formats: Formats the query was built from
+            
+        Returns:
+            The matching format, or None if it cannot be determined
+        """
+        if jid in phone_formats:
+            return jid
+        
+        user = jid.partition(':')[0]
+        return user if user in phone_formats else None
+    
+    def _query_contacts(self, phone_formats: Tuple[str, ...],
+                        tail_digits: Optional[str] = None) -> Iterator[tuple]:
+        """
+        Query whatsmeow_contacts for exact and/or fuzzy matches in one statement
+        
+        The exact branch matches the phone formats via _jid_filter. The fuzzy
+        branch matches JIDs whose user part ends with tail_digits, using a
+        case-sensitive GLOB anchored to the '@' / ':' boundary. Both branches
+        are combined with UNION ALL so a caller that wants both pays for a
+        single execute.
+        
+        Args:
+            phone_formats: Formats to match exactly (may be empty)
+            tail_digits: Trailing digits to match fuzzily, or None to skip
+            
+        Returns:
+            Iterator over rows of (their_jid, first_name, full_name, push_name, src) where
+            src is 'exact' or 'fuzzy'
+        """
+        branches = []
+        params: List[str] = []
+        
+        if phone_formats:
+            where, exact_params = self._jid_filter("their_jid", phone_formats)
+            branches.append(f"""
+                SELECT their_jid, first_name, full_name, push_name, 'exact' AS src
+                FROM whatsmeow_contacts 
+                WHERE {where}
+            """)
+            params.extend(exact_params)
+        
+        if tail_digits:
+            branches.append("""
+                SELECT their_jid, first_name, full_name, push_name, 'fuzzy' AS src
+                FROM whatsmeow_contacts 
+                WHERE their_jid GLOB ? OR their_jid GLOB ?
+            """)
+            params.extend([f"*{tail_digits}@*", f"*{tail_digits}:*"])
+        
+        if not branches:
+            return iter(())
+        
+        return self._query(self.contacts_db_path, "UNION ALL".join(branches), params)
     
-    def search_contacts_database(self, phone: str) -> List[ContactMatch]:
+    def search_contacts_database(self, phone: str,
+                                 phone_formats: Optional[Tuple[str, ...]] = None) -> List[ContactMatch]:
         """
         Search the WhatsApp contacts database for phone number matches
         
         Args:
             phone: Phone number to search for
+            phone_formats: Precomputed normalize_phone_number(phone) result
             
         Returns:
             List of ContactMatch objects found in contacts database
         """
         matches = []
-        phone_formats = self.normalize_phone_number(phone)
+        if phone_formats is None:
+            phone_formats = self.normalize_phone_number(phone)
         
         try:
-            conn = sqlite3.connect(self.contacts_db_path)
-            cursor = conn.cursor()
-            
-            # Search in contacts table
-            for phone_format in phone_formats:
-                # Search by JID
-                cursor.execute("""
-                    SELECT their_jid, first_name, full_name, push_name 
-                    FROM whatsmeow_contacts 
-                    WHERE their_jid LIKE ? OR their_jid = ?
-                """, (f"%{phone_format}%", phone_format))
+            for jid, first_name, full_name, push_name, _ in self._query_contacts(phone_formats):
+                name = full_name or first_name or push_name or "Unknown"
                 
-                results = cursor.fetchall()
-                for row in results:
-                    jid, first_name, full_name, push_name = row
-                    name = full_name or first_name or push_name or "Unknown"
-                    
-                    matches.append(ContactMatch(
-                        jid=jid,
-                        name=name,
-                        phone_number=phone_format,
-                        source="contacts_database"
-                    ))
+                matches.append(ContactMatch(
+                    jid=jid,
+                    name=name,
+                    phone_number=self._matched_format(jid, phone_formats),
+                    source="contacts_database",
+                    source_rank=2
+                ))
             
         except sqlite3.Error as e:
             print(f"Database error: {e}")
-        finally:
-            if conn:
-                conn.close()
         
         return matches
     
-    def search_message_history(self, phone: str) -> List[ContactMatch]:
+    def search_message_history(self, phone: str,
+                               phone_formats: Optional[Tuple[str, ...]] = None,
+                               limit: Optional[int] = None) -> List[ContactMatch]:
         """
         Search message history for senders matching the phone number
         
         Args:
             phone: Phone number to search for
+            phone_formats: Precomputed normalize_phone_number(phone) result
+            limit: Maximum (sender, chat) pairs to return, default MESSAGE_HISTORY_LIMIT
             
         Returns:
             List of ContactMatch objects found in message history
         """
-        matches = []
-        phone_formats = self.normalize_phone_number(phone)
+        if phone_formats is None:
+            phone_formats = self.normalize_phone_number(phone)
+        return self.search_message_history_batch({phone: phone_formats}, limit)[phone]
+    
+    def search_message_history_batch(self, formats_by_phone: Dict[str, Tuple[str, ...]],
+                                      limit: Optional[int] = None) -> Dict[str, List[ContactMatch]]:
+        """
+        Search message history for senders matching several phone numbers
+        
+        All phones are searched with one statement, but every phone gets its
+        own LIMIT branch, so a phone with many (sender, chat) pairs can't
+        crowd the others out: each result equals a single-phone search.
+        
+        Args:
+            formats_by_phone: Dictionary mapping phone -> normalize_phone_number(phone)
+            limit: Maximum (sender, chat) pairs per phone, default MESSAGE_HISTORY_LIMIT
+            
+        Returns:
+            Dictionary mapping each phone -> list of ContactMatch objects found in message history
+        """
+        phones = list(formats_by_phone)
+        matches: Dict[str, List[ContactMatch]] = {phone: [] for phone in phones}
+        if not phones:
+            return matches
         
         try:
-            conn = sqlite3.connect(self.messages_db_path)
-            cursor = conn.cursor()
+            # One UNION ALL branch per phone, each ranked and limited on its own,
+            # resolving contact names from the attached contacts DB
+            branches, params = [], []
+            for index, phone in enumerate(phones):
+                where, branch_params = self._jid_filter("sender", formats_by_phone[phone])
+                branches.append(f"""
+                    SELECT * FROM (
+                        SELECT {index} AS phone_index, sender, chat_jid, COUNT(*) as message_count
+                        FROM messages 
+                        WHERE {where}
+                        GROUP BY sender, chat_jid
+                        ORDER BY message_count DESC
+                        LIMIT {limit or self.MESSAGE_HISTORY_LIMIT}
+                    )
+                """)
+                params.extend(branch_params)
+            sender_stats = " UNION ALL ".join(branches)
             
-            for phone_format in phone_formats:
-                # Search message senders
-                cursor.execute("""
-                    SELECT DISTINCT sender, chat_jid, COUNT(*) as message_count
-                    FROM messages 
-                    WHERE sender LIKE ? OR sender = ?
-                    GROUP BY sender, chat_jid
-                    ORDER BY message_count DESC
-                """, (f"%{phone_format}%", phone_format))
+            self._get_connection(self.messages_db_path)  # opening it attaches the contacts DB
+            if self._contacts_attached:
+                contact_name = """
+                    (SELECT COALESCE(c.full_name, c.first_name, c.push_name)
+                     FROM contacts.whatsmeow_contacts c
+                     WHERE c.their_jid IN (s.sender, s.sender || '@s.whatsapp.net')
+                     LIMIT 1)
+                """
+            else:
+                contact_name = "NULL"
+            results = self._query(self.messages_db_path, f"""
+                SELECT s.phone_index, s.sender, s.chat_jid, s.message_count, {contact_name}
+                FROM ({sender_stats}) s
+                ORDER BY s.phone_index, s.message_count DESC
+            """, params)
+            
+            for row in results:
+                phone_index, sender_jid, chat_jid, msg_count, name = row
+                phone = phones[phone_index]
                 
-                results = cursor.fetchall()
-                for row in results:
-                    sender_jid, chat_jid, msg_count = row
-                    
-                    matches.append(ContactMatch(
-                        jid=sender_jid,
-                        name=f"Message Sender ({msg_count} messages)",
-                        phone_number=phone_format,
-                        source=f"message_history_{chat_jid}",
-                        groups=[chat_jid] if chat_jid.endswith('@g.us') else []
-                    ))
+                matches[phone].append(ContactMatch(
+                    jid=sender_jid,
+                    name=f"{name or 'Message Sender'} ({msg_count} messages)",
+                    phone_number=self._matched_format(sender_jid, formats_by_phone[phone]),
+                    source=f"message_history_{chat_jid}",
+                    groups={chat_jid} if chat_jid.endswith('@g.us') else set(),
+                    source_rank=1
+                ))
             
         except sqlite3.Error as e:
             print(f"Database error: {e}")
-        finally:
-            if conn:
-                conn.close()
         
         return matches
     
@@ -181,69 +465,140 @@ class PhoneToJIDLookup:
         """
         Get member lists for all groups via API
         
+        Results are cached for GROUPS_CACHE_TTL seconds; use refresh_groups()
+        to force a refetch.
+        
         Returns:
             Dictionary mapping group_jid -> list of member JIDs
         """
+        if self._groups_cache is not None and time.monotonic() < self._groups_cache_expiry:
+            return self._groups_cache
+        
         groups = {}
         
         # Get list of group chats
         try:
-            conn = sqlite3.connect(self.messages_db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT DISTINCT jid FROM chats WHERE jid LIKE '%@g.us'")
-            group_jids = [row[0] for row in cursor.fetchall()]
-            conn.close()
+            rows = self._query(self.messages_db_path, "SELECT DISTINCT jid FROM chats WHERE jid LIKE '%@g.us'")
+            group_jids = [row[0] for row in rows]
             
-            # Get members for each group via API
-            for group_jid in group_jids:
-                try:
-                    url = f"{self.api_base_url}/api/group/{group_jid}/members"
-                    response = requests.get(url, timeout=5)
-                    if response.status_code == 200:
-                        data = response.json()
-                        if "members" in data:
-                            groups[group_jid] = data["members"]
-                except Exception as e:
-                    print(f"Warning: Could not get members for {group_jid}: {e}")
+            # Get members for each group via API, several groups at a time
+            with ThreadPoolExecutor(max_workers=self.HTTP_POOL_SIZE) as executor:
+                for group_jid, members in zip(group_jids, executor.map(self._fetch_group_members, group_jids)):
+                    if members is not None:
+                        groups[group_jid] = members
                     
         except Exception as e:
             print(f"Error getting group lists: {e}")
+            return groups
         
+        # Only cache complete results so a bridge hiccup isn't remembered
+        if len(groups) == len(group_jids):
+            self._groups_cache = groups
+            self._groups_cache_expiry = time.monotonic() + self.GROUPS_CACHE_TTL
         return groups
     
-    def search_group_members(self, phone: str) -> List[ContactMatch]:
+    def refresh_groups(self) -> Dict[str, List[str]]:
+        """
+        Drop the cached group member lists and fetch them again
+        
+        Returns:
+            Dictionary mapping group_jid -> list of member JIDs
+        """
+        self._groups_cache = None
+        return self.get_group_lists()
+    
+    def _fetch_group_members(self, group_jid: str) -> Optional[List[str]]:
+        """
+        Fetch the member list of a single group from the bridge API
+        
+        Args:
+            group_jid: JID of the group
+            
+        Returns:
+            List of member JIDs, or None if the bridge could not provide them
+        """
+        try:
+            url = f"{self.api_base_url}/api/group/{group_jid}/members"
+            response = self._http.get(url, timeout=5)
+            if response.status_code == 200:
+                data = response.json()
+                if "members" in data:
+                    return data["members"]
+        except Exception as e:
+            print(f"Warning: Could not get members for {group_jid}: {e}")
+        
+        return None
+    
+    def _jid_user(self, jid: str) -> str:
+        """
+        Get the user part of a JID, without the device suffix or server
+        
+        Args:
+            jid: JID such as "972523451451:12@s.whatsapp.net"
+            
+        Returns:
+            The user part, e.g. "972523451451"
+        """
+        return jid.partition('@')[0].partition(':')[0]
+    
+    def get_member_index(self) -> Dict[str, List[Tuple[str, str]]]:
+        """
+        Get an index of group members keyed by the user part of their JID
+        
+        The index is rebuilt only when get_group_lists returns a different
+        result, so it lives exactly as long as the group list cache.
+        
+        Returns:
+            Dictionary mapping user -> list of (member_jid, group_jid)
+        """
+        groups = self.get_group_lists()
+        if groups is not self._member_index_source:
+            member_index: Dict[str, List[Tuple[str, str]]] = {}
+            for group_jid, members in groups.items():
+                for member_jid in members:
+                    member_index.setdefault(self._jid_user(member_jid), []).append((member_jid, group_jid))
+            
+            self._member_index = member_index
+            self._member_index_source = groups
+        
+        return self._member_index
+    
+    def search_group_members(self, phone: str,
+                             phone_formats: Optional[Tuple[str, ...]] = None) -> List[ContactMatch]:
         """
         Search group member lists for phone number matches
         
         Args:
             phone: Phone number to search for
+            phone_formats: Precomputed normalize_phone_number(phone) result
             
         Returns:
             List of ContactMatch objects found in group members
         """
         matches = []
-        phone_formats = self.normalize_phone_number(phone)
+        if phone_formats is None:
+            phone_formats = self.normalize_phone_number(phone)
         
-        print(f"🔍 Searching for phone formats: {phone_formats}")
+        print(f"🔍 Searching for phone formats: {list(phone_formats)}")
         
-        # Get all group member lists
-        groups = self.get_group_lists()
+        # Look each distinct user part up in the member index
+        member_index = self.get_member_index()
+        seen_users = set()
         
-        for group_jid, members in groups.items():
-            for member_jid in members:
-                # Check if any phone format matches the member JID
-                for phone_format in phone_formats:
-                    if (phone_format in member_jid or 
-                        member_jid == phone_format or
-                        member_jid.startswith(phone_format.replace('+', ''))):
-                        
-                        matches.append(ContactMatch(
-                            jid=member_jid,
-                            name="Group Member",
-                            phone_number=phone_format,
-                            source=f"group_member_{group_jid}",
-                            groups=[group_jid]
-                        ))
+        for phone_format in phone_formats:
+            user = self._jid_user(phone_format).lstrip('+')
+            if user in seen_users:
+                continue
+            seen_users.add(user)
+            
+            for member_jid, group_jid in member_index.get(user, []):
+                matches.append(ContactMatch(
+                    jid=member_jid,
+                    name="Group Member",
+                    phone_number=phone_format,
+                    source=f"group_member_{group_jid}",
+                    groups={group_jid}
+                ))
         
         return matches
     
@@ -261,38 +616,24 @@ class PhoneToJIDLookup:
         matches = []
         
         # Extract the last 7-10 digits for fuzzy matching
-        digits = re.sub(r'[^\d]', '', phone)
+        digits = phone.translate(_NON_DIGIT_TABLE)
         if len(digits) >= 7:
             last_digits = digits[-7:]  # Last 7 digits
             
             try:
-                conn = sqlite3.connect(self.contacts_db_path)
-                cursor = conn.cursor()
-                
-                # Search for JIDs containing these digits
-                cursor.execute("""
-                    SELECT their_jid, first_name, full_name, push_name 
-                    FROM whatsmeow_contacts 
-                    WHERE their_jid LIKE ?
-                """, (f"%{last_digits}%",))
-                
-                results = cursor.fetchall()
-                for row in results:
-                    jid, first_name, full_name, push_name = row
+                for jid, first_name, full_name, push_name, _ in self._query_contacts((), last_digits):
                     name = full_name or first_name or push_name or "Unknown"
                     
                     matches.append(ContactMatch(
                         jid=jid,
                         name=name,
                         phone_number=f"fuzzy_match_{last_digits}",
-                        source="fuzzy_search"
+                        source="fuzzy_search",
+                        source_rank=2
                     ))
                     
             except sqlite3.Error as e:
                 print(f"Database error in fuzzy search: {e}")
-            finally:
-                if conn:
-                    conn.close()
         
         return matches
     
@@ -308,49 +649,92 @@ class PhoneToJIDLookup:
             List of all ContactMatch objects found across all sources
         """
         print(f"🔍 Looking up phone number: {phone}")
-        print(f"📋 Normalized formats: {self.normalize_phone_number(phone)}")
-        
-        all_matches = []
-        
-        # Search contacts database
-        print("\n📖 Searching contacts database...")
-        contacts_matches = self.search_contacts_database(phone)
-        all_matches.extend(contacts_matches)
-        print(f"   Found {len(contacts_matches)} matches in contacts database")
-        
-        # Search message history
-        print("\n💬 Searching message history...")
-        message_matches = self.search_message_history(phone)
-        all_matches.extend(message_matches)
-        print(f"   Found {len(message_matches)} matches in message history")
-        
-        # Search group members
-        print("\n👥 Searching group members...")
-        group_matches = self.search_group_members(phone)
-        all_matches.extend(group_matches)
-        print(f"   Found {len(group_matches)} matches in group members")
-        
-        # Fuzzy search if enabled and no exact matches found
-        if include_fuzzy and len(all_matches) == 0:
-            print("\n🔍 Performing fuzzy search...")
-            fuzzy_matches = self.fuzzy_search_by_name(phone)
-            all_matches.extend(fuzzy_matches)
-            print(f"   Found {len(fuzzy_matches)} fuzzy matches")
-        
-        # Remove duplicates based on JID
-        unique_matches = {}
-        for match in all_matches:
-            if match.jid not in unique_matches:
-                unique_matches[match.jid] = match
-            else:
-                # Merge group information
-                existing = unique_matches[match.jid]
-                existing.groups.extend(match.groups)
-                existing.groups = list(set(existing.groups))  # Remove duplicates
+        print(f"📋 Normalized formats: {list(self.normalize_phone_number(phone))}")
+        
+        return self.lookup_phone_numbers([phone], include_fuzzy=include_fuzzy)[phone]
+    
+    def lookup_phone_numbers(self, phones: List[str], include_fuzzy: bool = True) -> Dict[str, List[ContactMatch]]:
+        """
+        Batch lookup - searches all sources for several phone numbers at once
+        
+        The formats of all phones are searched together, so the whole batch
+        costs one query per database and one group list fetch.
+        
+        Args:
+            phones: Phone numbers to search for
+            include_fuzzy: Whether to include fuzzy matching results
+            
+        Returns:
+            Dictionary mapping each input phone -> list of ContactMatch objects
+        """
+        formats_by_phone = {phone: self.normalize_phone_number(phone) for phone in phones}
+        
+        # Which input phones each format belongs to, for routing matches back
+        phones_by_format: Dict[str, List[str]] = {}
+        for phone, phone_formats in formats_by_phone.items():
+            for phone_format in phone_formats:
+                phones_by_format.setdefault(phone_format, []).append(phone)
+        all_formats = tuple(phones_by_format)
+        batch_label = ", ".join(formats_by_phone)
+        
+        # The three sources are independent (two DB files and the bridge API),
+        # so search them concurrently and report in a fixed order
+        print("\n📖 Searching contacts database, 💬 message history and 👥 group members...")
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            contacts_future = executor.submit(self.search_contacts_database, batch_label, all_formats)
+            message_future = executor.submit(self.search_message_history_batch, formats_by_phone)
+            group_future = executor.submit(self.search_group_members, batch_label, all_formats)
+        
+        all_matches: Dict[str, List[ContactMatch]] = {phone: [] for phone in formats_by_phone}
+        
+        def add_by_format(source_matches: List[ContactMatch], description: str):
+            print(f"   Found {len(source_matches)} matches in {description}")
+            for match in source_matches:
+                for phone in phones_by_format.get(match.phone_number, []):
+                    # Copy so merging one phone's matches can't affect another's
+                    all_matches[phone].append(replace(match, groups=set(match.groups)))
+        
+        add_by_format(contacts_future.result(), "contacts database")
+        
+        # Message history comes back already split per phone, each with its own limit
+        message_matches = message_future.result()
+        print(f"   Found {sum(map(len, message_matches.values()))} matches in message history")
+        for phone, phone_matches in message_matches.items():
+            all_matches[phone].extend(phone_matches)
+        
+        add_by_format(group_future.result(), "group members")
+        
+        results = {}
+        for phone, matches in all_matches.items():
+            # Fuzzy search if enabled and no exact matches found
+            if include_fuzzy and len(matches) == 0:
+                print(f"\n🔍 Performing fuzzy search for {phone}...")
+                fuzzy_matches = self.fuzzy_search_by_name(phone)
+                matches.extend(fuzzy_matches)
+                print(f"   Found {len(fuzzy_matches)} fuzzy matches")
+            
+            results[phone] = self._merge_matches(matches)
+        
+        return results
+    
+    def _merge_matches(self, matches: List[ContactMatch]) -> List[ContactMatch]:
+        """
+        Remove duplicates based on JID, merging groups and keeping the best name
+        
+        Args:
+            matches: Matches for a single phone number, in source order
+            
+        Returns:
+            One ContactMatch per JID
+        """
+        unique_matches: Dict[str, ContactMatch] = {}
+        for match in matches:
+            existing = unique_matches.setdefault(match.jid, match)
+            if existing is not match:
+                existing.groups |= match.groups
                 
-                # Update name if current match has a better name
-                if match.name and match.name != "Group Member" and existing.name == "Group Member":
-                    existing.name = match.name
+                best = max(existing, match, key=lambda m: m.source_rank)
+                existing.name, existing.source_rank = best.name, best.source_rank
         
         return list(unique_matches.values())
     
@@ -385,7 +769,7 @@ class PhoneToJIDLookup:
             
             if match.groups:
                 print(f"   👥 Groups ({len(match.groups)}):")
-                for group in match.groups:
+                for group in sorted(match.groups):
                     print(f"      - {group}")
             else:
                 print(f"   👥 Groups: None")
@@ -394,7 +778,8 @@ class PhoneToJIDLookup:
 
 def main():
     parser = argparse.ArgumentParser(description='Look up WhatsApp JID from phone number')
-    parser.add_argument('phone', help='Phone number to look up (e.g., +972523451451)')
+    parser.add_argument('phones', nargs='+', metavar='phone',
+                        help='Phone number(s) to look up (e.g., +972523451451)')
     parser.add_argument('--no-fuzzy', action='store_true', help='Disable fuzzy matching')
     parser.add_argument('--messages-db', default='whatsapp-mcp/whatsapp-bridge/store/messages.db',
                         help='Path to messages database')
@@ -402,6 +787,8 @@ def main():
                         help='Path to contacts database')
     parser.add_argument('--api-url', default='http://localhost:8080',
                         help='WhatsApp bridge API base URL')
+    parser.add_argument('--explain', action='store_true',
+                        help='Print the SQLite query plan of every lookup query')
     
     args = parser.parse_args()
     
@@ -409,14 +796,21 @@ def main():
     lookup = PhoneToJIDLookup(
         messages_db_path=args.messages_db,
         contacts_db_path=args.contacts_db,
-        api_base_url=args.api_url
+        api_base_url=args.api_url,
+        explain=args.explain
     )
     
     # Perform lookup
-    matches = lookup.lookup_phone_number(args.phone, include_fuzzy=not args.no_fuzzy)
+    if len(args.phones) == 1:
+        results = {args.phones[0]: lookup.lookup_phone_number(args.phones[0], include_fuzzy=not args.no_fuzzy)}
+    else:
+        results = lookup.lookup_phone_numbers(args.phones, include_fuzzy=not args.no_fuzzy)
     
     # Print results
-    lookup.print_results(matches, args.phone)
+    matches = []
+    for phone, phone_matches in results.items():
+        lookup.print_results(phone_matches, phone)
+        matches.extend(phone_matches)
     
     # Return matches for programmatic use
     return matches
@@ -1,37 +1,43 @@
 #!/usr/bin/env python3
 
-import subprocess
 import sys
 import time
 import os
 from datetime import datetime, timedelta
 
-def run_command(command, description):
-    """Run a command and return success status."""
+import forward_links_preview
+import test_bridge
+
+# Database the link preview script reads in production
+MESSAGES_DB_PATH = "/app/persistent/messages.db"
+
+def run_step(func, description):
+    """Run a step in-process and return success status."""
     print(f"🔄 {description}")
-    print(f"💻 Command: {command}")
     
     try:
-        result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=300)
-        
-        if result.returncode == 0:
+        if func():
             print(f"✅ {description} - SUCCESS")
-            if result.stdout.strip():
-                print(f"📋 Output: {result.stdout.strip()}")
             return True
         else:
             print(f"❌ {description} - FAILED")
-            if result.stderr.strip():
-                print(f"🚨 Error: {result.stderr.strip()}")
             return False
             
-    except subprocess.TimeoutExpired:
-        print(f"⏰ {description} - TIMEOUT")
-        return False
     except Exception as e:
         print(f"❌ {description} - EXCEPTION: {str(e)}")
         return False
 
+def run_link_preview():
+    """Run the link preview forwarder in non-interactive mode."""
+    return forward_links_preview.run_non_interactive_mode(
+        db_path=MESSAGES_DB_PATH,
+        delay=forward_links_preview.DEFAULT_DELAY,
+    )
+
+def run_bridge_test():
+    """Wait for the bridge and send the test message."""
+    return test_bridge.wait_for_bridge(max_wait_seconds=120) and test_bridge.send_test_message()
+
 def wait_for_bridge_startup(max_wait_minutes=5):
     """Wait for WhatsApp bridge to start up."""
     print(f"⏳ Waiting up to {max_wait_minutes} minutes for bridge startup...")
@@ -52,32 +58,14 @@ def run_initial_link_preview():
     
     print(f"📅 Time range: {yesterday_start} to {now}")
     
-    # Set environment variables for the script
-    env = os.environ.copy()
-    env['INITIAL_RUN'] = 'true'
-    env['START_TIME'] = yesterday_start.isoformat()
-    env['END_TIME'] = now.isoformat()
-    
-    # Run the forward links preview script
-    command = "python3 /app/forward_links_preview.py --db-path /app/persistent/messages.db --non-interactive"
-    
     try:
-        result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=600, env=env)
-        
-        if result.returncode == 0:
+        if run_link_preview():
             print("✅ Initial link preview completed successfully!")
-            if result.stdout.strip():
-                print(f"📋 Output: {result.stdout.strip()}")
             return True
         else:
             print("❌ Initial link preview failed!")
-            if result.stderr.strip():
-                print(f"🚨 Error: {result.stderr.strip()}")
             return False
             
-    except subprocess.TimeoutExpired:
-        print("⏰ Initial link preview timed out!")
-        return False
     except Exception as e:
         print(f"❌ Initial link preview exception: {str(e)}")
         return False
@@ -93,8 +81,7 @@ def main():
     if is_cron_run:
         print("⏰ Detected Railway cron execution - running link preview only")
         # For cron runs, just run the link preview script normally
-        if run_command("python3 /app/forward_links_preview.py --db-path /app/persistent/messages.db --non-interactive", 
-                      "Running scheduled link preview"):
+        if run_step(run_link_preview, "Running scheduled link preview"):
             print("✅ Scheduled link preview completed successfully!")
         else:
             print("❌ Scheduled link preview failed!")
@@ -117,7 +104,7 @@ def main():
     print("STEP 2: Bridge Functionality Test")
     print("=" * 40)
     
-    if not run_command("python3 /app/test_bridge.py", "Testing WhatsApp bridge functionality"):
+    if not run_step(run_bridge_test, "Testing WhatsApp bridge functionality"):
         print("❌ Post-deployment failed: Bridge test failed!")
         sys.exit(1)
     
@@ -11,26 +11,38 @@ BRIDGE_API_BASE_URL = "http://localhost:8080/api"
 TEST_RECIPIENT = "972526060403@s.whatsapp.net"
 TEST_MESSAGE = "hello world"
 
+# Shared keep-alive session so status polls and the test send reuse one connection
+session = requests.Session()
+
 def wait_for_bridge(max_wait_seconds=60):
     """Wait for WhatsApp bridge to be ready."""
     print("🔍 Waiting for WhatsApp bridge to be ready...")
     
-    for attempt in range(max_wait_seconds):
+    # Poll quickly at first, then back off exponentially up to 2s between probes
+    deadline = time.monotonic() + max_wait_seconds
+    attempt = 0
+    
+    while True:
+        attempt += 1
+        elapsed = max_wait_seconds - (deadline - time.monotonic())
         try:
-            response = requests.get(f"{BRIDGE_API_BASE_URL}/status", timeout=5)
+            response = session.get(f"{BRIDGE_API_BASE_URL}/status", timeout=5)
             if response.status_code == 200:
                 status = response.json()
                 if status.get("connected", False):
                     print("✅ WhatsApp bridge is connected and ready!")
                     return True
                 else:
-                    print(f"⏳ Bridge starting... (attempt {attempt + 1}/{max_wait_seconds})")
+                    print(f"⏳ Bridge starting... (attempt {attempt}, {elapsed:.1f}s/{max_wait_seconds}s)")
             else:
-                print(f"⏳ Bridge not ready... (attempt {attempt + 1}/{max_wait_seconds})")
+                print(f"⏳ Bridge not ready... (attempt {attempt}, {elapsed:.1f}s/{max_wait_seconds}s)")
         except requests.RequestException:
-            print(f"⏳ Waiting for bridge... (attempt {attempt + 1}/{max_wait_seconds})")
+            print(f"⏳ Waiting for bridge... (attempt {attempt}, {elapsed:.1f}s/{max_wait_seconds}s)")
         
-        time.sleep(1)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        time.sleep(min(0.1 * 2 ** (attempt - 1), 2.0, remaining))
     
     print("❌ Bridge failed to become ready within timeout")
     return False
@@ -47,7 +59,7 @@ def send_test_message():
             "message": TEST_MESSAGE,
         }
         
-        response = requests.post(url, json=payload, timeout=10)
+        response = session.post(url, json=payload, timeout=10)
         
         if response.status_code == 200:
             result = response.json()
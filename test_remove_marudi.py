@@ -11,18 +11,62 @@ Usage:
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import sqlite3
 import time
 import sys
-from typing import List, Dict, Optional
-from phone_to_jid_lookup import PhoneToJIDLookup
+import functools
+import threading
+import socket
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple, FrozenSet
+from phone_to_jid_lookup import PhoneToJIDLookup, ContactMatch
+
+try:
+    import orjson  # Optional: much faster encode/decode of bridge payloads
+except ImportError:
+    orjson = None
+
+
+def json_dumps(payload) -> bytes:
+    """Encode a request body, using orjson when it is installed"""
+    return orjson.dumps(payload) if orjson else json.dumps(payload).encode("utf-8")
+
+
+def json_loads(content: bytes):
+    """Decode a response body, using orjson when it is installed"""
+    return orjson.loads(content) if orjson else json.loads(content)
 
 
 class GroupManagementTester:
+    # Seconds a fetched group member list is reused before refetching
+    MEMBERS_CACHE_TTL = 30
+    # How long and how often to re-check membership after a removal
+    VERIFY_TIMEOUT = 5.0
+    VERIFY_POLL_INTERVAL = 0.2
+    # Concurrent bridge round-trips when checking or verifying many (group, contact) pairs
+    MAX_WORKERS = 8
+    # Sent with POSTs whose body is pre-encoded by json_dumps
+    JSON_HEADERS = {"Content-Type": "application/json"}
+    
     def __init__(self, api_base_url: str = "http://localhost:8080"):
         self.api_base_url = api_base_url
         self.lookup = PhoneToJIDLookup()
+        # Repeated lookups of the same phone are answered from memory
+        self.cached_lookup = functools.lru_cache(maxsize=1024)(self._lookup_phone)
+        
+        # One keep-alive session for every bridge call
+        self.session = requests.Session()
+        self.session.headers["Connection"] = "keep-alive"
+        self.session.mount("http://", HTTPAdapter(pool_connections=10, pool_maxsize=20,
+                                                  max_retries=Retry(total=2, backoff_factor=0.2)))
+        
+        # group_jid -> (fetched_at, member IDs); dropped after a removal from that group
+        self._members_cache: Dict[str, Tuple[float, FrozenSet[str]]] = {}
+        self._members_lock = threading.Lock()
         
         # Target details
         self.target_phone = "972523451451"
@@ -32,19 +76,33 @@ class GroupManagementTester:
         
     def check_bridge_status(self) -> bool:
         """Check if the WhatsApp bridge is running and accessible"""
+        url = urlparse(self.api_base_url)
+        port = url.port or (443 if url.scheme == "https" else 80)
+        
         try:
-            response = requests.get(f"{self.api_base_url}/api/send", timeout=5)
-            print("✅ WhatsApp bridge is running")
-            return True
-        except Exception as e:
-            print(f"❌ WhatsApp bridge not accessible: {e}")
-            return False
+            # A TCP connect is enough to know the bridge is listening
+            with socket.create_connection((url.hostname, port), timeout=1.0):
+                pass
+        except Exception:
+            # Not directly reachable (e.g. behind a proxy): fall back to an HTTP request
+            try:
+                self.session.get(f"{self.api_base_url}/api/send", timeout=5)
+            except Exception as e:
+                print(f"❌ WhatsApp bridge not accessible: {e}")
+                return False
+        
+        print("✅ WhatsApp bridge is running")
+        return True
+    
+    def _lookup_phone(self, phone: str) -> Tuple[ContactMatch, ...]:
+        """Look up every JID variant of a phone number via the local databases and bridge"""
+        return tuple(self.lookup.lookup_phone_number(phone))
     
     def find_target_contact(self) -> List[Dict]:
         """Find all possible JIDs for the target contact"""
         print(f"\n🔍 Looking up target contact: {self.target_phone}")
         
-        matches = self.lookup.lookup_phone_number(self.target_phone)
+        matches = self.cached_lookup(self.target_phone)
         
         if not matches:
             print(f"❌ Contact {self.target_phone} not found in any format")
@@ -69,17 +127,13 @@ class GroupManagementTester:
     
     def check_group_endpoints(self) -> bool:
         """Check if group management endpoints exist"""
-        test_group = self.target_groups[0]
-        
         print(f"\n🧪 Testing existing group management endpoints...")
         
-        # Test group member removal endpoint
+        # Test the bulk removal endpoint run_full_test uses; an empty request
+        # is rejected by the bridge without contacting WhatsApp
         try:
-            url = f"{self.api_base_url}/api/group/{test_group}/participants/remove"
-            response = requests.post(url, json={
-                "participants": ["test@test.com"],
-                "action": "remove"
-            }, timeout=15)
+            url = f"{self.api_base_url}/api/group/participants/remove_bulk"
+            response = self.session.post(url, json={"operations": []}, timeout=15)
             
             if response.status_code == 404:
                 print("❌ Group management endpoints not found")
@@ -105,19 +159,16 @@ class GroupManagementTester:
         print(f"Please follow these steps:")
         print(f"\n1. 📁 Open: whatsapp-mcp/whatsapp-bridge/main.go")
         print(f"2. 🔍 Find the startRESTServer function (around line 850)")
-        print(f"3. ➕ Add these route handlers after existing routes:\n")
+        print(f"3. ➕ Add this bulk removal route handler after existing routes:\n")
         
         endpoint_code = '''
-// Group Management - Remove Participants
-router.HandleFunc("/api/group/{jid}/participants/remove", func(w http.ResponseWriter, r *http.Request) {
-    vars := mux.Vars(r)
-    groupJID := vars["jid"]
-    
-    logger.Infof("Received request to remove participants from group: %s", groupJID)
-    
+// Group Management - Remove Participants from several groups in one request
+router.HandleFunc("/api/group/participants/remove_bulk", func(w http.ResponseWriter, r *http.Request) {
     var req struct {
-        Participants []string `json:"participants"`
-        Action       string   `json:"action"`
+        Operations []struct {
+            GroupJID     string   `json:"group_jid"`
+            Participants []string `json:"participants"`
+        } `json:"operations"`
     }
     
     if err := json.NewDecoder(r.Body).Decode(&req); err != nil {
@@ -126,56 +177,68 @@ router.HandleFunc("/api/group/{jid}/participants/remove", func(w http.ResponseWr
         return
     }
     
-    if len(req.Participants) == 0 {
-        logger.Errorf("No participants specified for removal")
-        writeJSONError(w, "No participants specified", http.StatusBadRequest)
+    if len(req.Operations) == 0 {
+        logger.Errorf("No operations specified for bulk removal")
+        writeJSONError(w, "No operations specified", http.StatusBadRequest)
         return
     }
     
-    // Parse group JID
-    jid, err := types.ParseJID(groupJID)
-    if err != nil {
-        logger.Errorf("Invalid group JID: %v", err)
-        writeJSONError(w, "Invalid group JID", http.StatusBadRequest)
-        return
-    }
+    logger.Infof("Received bulk request to remove participants from %d groups", len(req.Operations))
+    
+    // Run each group's removal and report per-group results
+    results := make([]map[string]interface{}, 0, len(req.Operations))
+    allSucceeded := true
+    for _, op := range req.Operations {
+        result := map[string]interface{}{
+            "group_jid": op.GroupJID,
+            "success":   false,
+        }
+        results = append(results, result)
     
-    // Convert participant strings to JIDs
-    var participantJIDs []types.JID
-    for _, participant := range req.Participants {
-        pJID, err := types.ParseJID(participant)
+        jid, err := types.ParseJID(op.GroupJID)
         if err != nil {
-            logger.Warnf("Invalid participant JID %s: %v", participant, err)
+            logger.Errorf("Invalid group JID %s: %v", op.GroupJID, err)
+            result["error"] = "Invalid group JID"
+            allSucceeded = false
             continue
         }
-        participantJIDs = append(participantJIDs, pJID)
-    }
     
-    if len(participantJIDs) == 0 {
-        logger.Errorf("No valid participant JIDs found")
-        writeJSONError(w, "No valid participants", http.StatusBadRequest)
-        return
-    }
+        var participantJIDs []types.JID
+        var validParticipants []string
+        for _, participant := range op.Participants {
+            pJID, err := types.ParseJID(participant)
+            if err != nil {
+                logger.Warnf("Invalid participant JID %s: %v", participant, err)
+                continue
+            }
+            participantJIDs = append(participantJIDs, pJID)
+            validParticipants = append(validParticipants, participant)
+        }
     
-    // Perform the removal
-    _, err = client.UpdateGroupParticipants(context.Background(), jid, participantJIDs, whatsmeow.ParticipantChangeRemove)
-    if err != nil {
-        logger.Errorf("Failed to remove participants: %v", err)
-        writeJSONError(w, fmt.Sprintf("Failed to remove participants: %v", err), http.StatusInternalServerError)
-        return
-    }
+        if len(participantJIDs) == 0 {
+            logger.Errorf("No valid participant JIDs found for group %s", op.GroupJID)
+            result["error"] = "No valid participants"
+            allSucceeded = false
+            continue
+        }
     
-    logger.Infof("Successfully removed %d participants from group %s", len(participantJIDs), groupJID)
+        _, err = client.UpdateGroupParticipants(jid, participantJIDs, whatsmeow.ParticipantChangeRemove)
+        if err != nil {
+            logger.Errorf("Failed to remove participants from group %s: %v", op.GroupJID, err)
+            result["error"] = fmt.Sprintf("Failed to remove participants: %v", err)
+            allSucceeded = false
+            continue
+        }
     
-    response := map[string]interface{}{
-        "success": true,
-        "message": fmt.Sprintf("Successfully removed %d participants", len(participantJIDs)),
-        "group_jid": groupJID,
-        "removed_participants": req.Participants,
+        logger.Infof("Successfully removed %d participants from group %s", len(participantJIDs), op.GroupJID)
+        result["success"] = true
+        result["removed_participants"] = validParticipants
     }
     
-    w.Header().Set("Content-Type", "application/json")
-    json.NewEncoder(w).Encode(response)
+    writeJSONResponse(w, map[string]interface{}{
+        "success": allSucceeded,
+        "results": results,
+    })
 }).Methods("POST")
 '''
         
@@ -187,24 +250,38 @@ router.HandleFunc("/api/group/{jid}/participants/remove", func(w http.ResponseWr
         
         return False
     
+    def member_id(self, jid: str) -> str:
+        """Normalize a JID for membership checks to its user part (no device or server)"""
+        return jid.split("@", 1)[0].split(":", 1)[0]
+    
+    def get_group_member_ids(self, group_jid: str) -> Optional[FrozenSet[str]]:
+        """Get the normalized member IDs of a group, reusing a recent fetch if there is one"""
+        with self._members_lock:
+            cached = self._members_cache.get(group_jid)
+        if cached and time.monotonic() - cached[0] < self.MEMBERS_CACHE_TTL:
+            return cached[1]
+        
+        url = f"{self.api_base_url}/api/group/{group_jid}/members"
+        response = self.session.get(url, timeout=10)
+        
+        if response.status_code != 200:
+            return None
+        
+        member_ids = frozenset(self.member_id(member) for member in json_loads(response.content).get("members", []))
+        with self._members_lock:
+            self._members_cache[group_jid] = (time.monotonic(), member_ids)
+        return member_ids
+    
+    def invalidate_group_members(self, group_jid: str):
+        """Forget the cached member list of a group after it changed"""
+        with self._members_lock:
+            self._members_cache.pop(group_jid, None)
+    
     def check_contact_in_group(self, contact_jid: str, group_jid: str) -> bool:
-        """Check if contact exists in the specified group"""
+        """Check if contact exists in the specified group (accepts a full JID or a bare member ID)"""
         try:
-            url = f"{self.api_base_url}/api/group/{group_jid}/members"
-            response = requests.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                members = data.get("members", [])
-                
-                # Check exact match and similar matches
-                for member in members:
-                    if (member == contact_jid or 
-                        contact_jid in member or 
-                        member.replace("@s.whatsapp.net", "") == contact_jid.replace("@s.whatsapp.net", "")):
-                        return True
-                        
-            return False
+            member_ids = self.get_group_member_ids(group_jid)
+            return member_ids is not None and self.member_id(contact_jid) in member_ids
             
         except Exception as e:
             print(f"⚠️  Error checking group membership: {e}")
@@ -221,10 +298,11 @@ router.HandleFunc("/api/group/{jid}/participants/remove", func(w http.ResponseWr
                 "action": "remove"
             }
             
-            response = requests.post(url, json=payload, timeout=15)
+            response = self.session.post(url, data=json_dumps(payload), headers=self.JSON_HEADERS, timeout=15)
             
             if response.status_code == 200:
-                result = response.json()
+                self.invalidate_group_members(group_jid)
+                result = json_loads(response.content)
                 print(f"✅ Successfully removed contact!")
                 print(f"   Response: {result.get('message', 'Success')}")
                 return True
@@ -237,13 +315,51 @@ router.HandleFunc("/api/group/{jid}/participants/remove", func(w http.ResponseWr
             print(f"❌ Error during removal: {e}")
             return False
     
+    def remove_contacts_bulk(self, operations: List[Dict]) -> Dict[str, Dict]:
+        """Remove contacts from several groups with a single bridge request
+        
+        Args:
+            operations: List of {"group_jid": ..., "participants": [...]} dicts
+            
+        Returns:
+            Per-group result dicts from the bridge, keyed by group JID
+        """
+        print(f"\n🚫 Attempting bulk removal across {len(operations)} group(s)")
+        
+        try:
+            url = f"{self.api_base_url}/api/group/participants/remove_bulk"
+            response = self.session.post(url, data=json_dumps({"operations": operations}), headers=self.JSON_HEADERS, timeout=15 * len(operations))
+            
+            if response.status_code == 200:
+                results = json_loads(response.content).get("results", [])
+                for result in results:
+                    if result.get("success"):
+                        self.invalidate_group_members(result["group_jid"])
+                        print(f"✅ Removed {len(result.get('removed_participants', []))} participant(s) from {result['group_jid']}")
+                    else:
+                        print(f"❌ Removal from {result.get('group_jid')} failed: {result.get('error', 'Unknown error')}")
+                return {result.get("group_jid"): result for result in results}
+            else:
+                print(f"❌ Bulk removal failed: HTTP {response.status_code}")
+                print(f"   Response: {response.text}")
+                return {}
+                
+        except Exception as e:
+            print(f"❌ Error during bulk removal: {e}")
+            return {}
+    
     def verify_removal(self, contact_jid: str, group_jid: str) -> bool:
         """Verify that contact was successfully removed from group"""
         print(f"\n🔍 Verifying removal of {contact_jid} from {group_jid}")
         
-        time.sleep(2)  # Give time for the change to propagate
-        
-        still_in_group = self.check_contact_in_group(contact_jid, group_jid)
+        # Poll until the change propagates instead of waiting a fixed time
+        deadline = time.monotonic() + self.VERIFY_TIMEOUT
+        while True:
+            self.invalidate_group_members(group_jid)
+            still_in_group = self.check_contact_in_group(contact_jid, group_jid)
+            if not still_in_group or time.monotonic() >= deadline:
+                break
+            time.sleep(self.VERIFY_POLL_INTERVAL)
         
         if not still_in_group:
             print(f"✅ Verification successful: Contact removed from group")
@@ -272,33 +388,57 @@ router.HandleFunc("/api/group/{jid}/participants/remove", func(w http.ResponseWr
             self.add_group_management_endpoints()
             return False
         
-        # Step 4: Test removal for each contact variant in each target group
+        # Step 4: Test removal for each contact in each target group. Variants of one
+        # person (e.g. "972...@s.whatsapp.net" and a bare "972..." sender) share a
+        # member ID, so each person is removed and counted once, by canonical JID
+        members = {}
+        for variant in contact_variants:
+            members.setdefault(self.member_id(variant['jid']), variant)
+        
         success_count = 0
-        total_attempts = 0
+        total_attempts = len(self.target_groups) * len(members)
         
-        for group_jid in self.target_groups:
-            print(f"\n📊 Testing removal from group: {group_jid}")
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+            # Find which members are actually in each group, fetching each member list once
+            member_ids = list(members)
+            in_group = executor.map(
+                lambda group_jid: [self.check_contact_in_group(member_id, group_jid) for member_id in member_ids],
+                self.target_groups
+            )
             
-            for variant in contact_variants:
-                contact_jid = variant['jid']
-                total_attempts += 1
-                
-                # Check if contact is in this group
-                if self.check_contact_in_group(contact_jid, group_jid):
-                    print(f"✅ Found {contact_jid} in group {group_jid}")
-                    
-                    # Attempt removal
-                    if self.remove_contact_from_group(contact_jid, group_jid):
-                        # Verify removal
-                        if self.verify_removal(contact_jid, group_jid):
-                            success_count += 1
-                            print(f"🎉 Successfully removed {variant['name']} from group!")
-                        else:
-                            print(f"⚠️  Removal command succeeded but verification failed")
+            operations = {}
+            present = []  # (group_jid, contact_jid, name) to remove and verify
+            for group_jid, memberships in zip(self.target_groups, in_group):
+                print(f"\n📊 Testing removal from group: {group_jid}")
+                for member_id, is_member in zip(member_ids, memberships):
+                    contact_jid = f"{member_id}@s.whatsapp.net"
+                    if is_member:
+                        print(f"✅ Found {contact_jid} in group {group_jid}")
+                        operations.setdefault(group_jid, []).append(contact_jid)
+                        present.append((group_jid, contact_jid, members[member_id]['name']))
                     else:
-                        print(f"❌ Failed to remove {variant['name']} from group")
+                        print(f"ℹ️  {contact_jid} not found in group {group_jid}")
+            
+            # Remove everything in one request, then verify every member concurrently
+            results = self.remove_contacts_bulk([
+                {"group_jid": group_jid, "participants": participants}
+                for group_jid, participants in operations.items()
+            ]) if operations else {}
+            
+            removed = []
+            for group_jid, contact_jid, name in present:
+                if results.get(group_jid, {}).get("success"):
+                    removed.append((group_jid, contact_jid, name))
+                else:
+                    print(f"❌ Failed to remove {name} from group")
+            
+            verified = executor.map(lambda entry: self.verify_removal(entry[1], entry[0]), removed)
+            for (group_jid, contact_jid, name), is_removed in zip(removed, verified):
+                if is_removed:
+                    success_count += 1
+                    print(f"🎉 Successfully removed {name} from group!")
                 else:
-                    print(f"ℹ️  {contact_jid} not found in group {group_jid}")
+                    print(f"⚠️  Removal command succeeded but verification failed")
         
         # Final results
         print(f"\n" + "="*50)
@@ -1,27 +1,328 @@
 #!/usr/bin/env python3
 
-from flask import Flask, jsonify, render_template_string
+from flask import Flask, Response, jsonify, request, make_response
+from flask.json.provider import DefaultJSONProvider
 import subprocess
+import hashlib
+import gzip
+import selectors
+import queue
+import collections
+import itertools
+import re
 import threading
 import time
 import os
 import sys
 import signal
+import fcntl
+import logging
+import logging.handlers
+
+try:
+    import orjson  # Optional: C-accelerated JSON for every endpoint
+except ImportError:
+    orjson = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes with orjson (keys sorted, like the default)."""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_SORT_KEYS).decode("utf-8")
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
 
 app = Flask(__name__)
+if orjson:
+    app.json = OrjsonProvider(app)
+
+# Bridge log lines kept in memory (overridable via BRIDGE_LOG_LIMIT) and how many /logs returns
+BRIDGE_LOG_LIMIT = int(os.environ.get("BRIDGE_LOG_LIMIT", 500))
+LOGS_TAIL_LINES = 50
 
 # Global status tracking
 service_status = {
     "web_server_ready": True,
     "bridge_process": None,
+    "bridge_reader": None,
     "qr_code": None,
-    "bridge_logs": [],
+    "bridge_logs": collections.deque(maxlen=BRIDGE_LOG_LIMIT),  # Only the recent tail is ever served
+    "bridge_log_total": 0,
     "startup_time": time.time()
 }
 
+# Guards compound reads and writes of service_status shared by the bridge and request threads
+status_lock = threading.Lock()
+
+# Woken whenever the QR state or deployment flow status changes (drives /qr-stream)
+status_changed = threading.Condition()
+status_version = 0
+
+# /qr-stream sends a keep-alive comment this often and closes after SSE_MAX_SECONDS
+# (EventSource reconnects on its own), so idle streams don't pin server threads forever
+SSE_KEEPALIVE_SECONDS = 15
+SSE_MAX_SECONDS = 300
+
+def notify_status_change():
+    """Wake every /qr-stream client after a QR or deployment status change."""
+    global status_version
+    with status_changed:
+        status_version += 1
+        status_changed.notify_all()
+
+def set_deployment_flow_status(status, output=None, error=None):
+    """Update the deployment flow status together with its output or error.
+    
+    Args:
+        status: New deployment_flow_status value
+        output: Captured stdout to store with the status, if any
+        error: Error text to store with the status, if any
+    """
+    with status_lock:
+        service_status["deployment_flow_status"] = status
+        if output is not None:
+            service_status["deployment_flow_output"] = output
+        if error is not None:
+            service_status["deployment_flow_error"] = error
+    notify_status_change()
+
+def claim_deployment_flow(allow_rerun=False):
+    """Mark the deployment flow as running unless it is already running or done.
+    
+    Args:
+        allow_rerun: Also claim a flow that has already completed (manual re-runs)
+        
+    Returns:
+        True if the caller should start the flow
+    """
+    blocking = ("running",) if allow_rerun else ("running", "completed")
+    with status_lock:
+        if service_status.get("deployment_flow_status") in blocking:
+            return False
+        service_status["deployment_flow_status"] = "running"
+    notify_status_change()
+    return True
+
+def status_snapshot(*keys):
+    """Read several service_status fields under one lock acquisition."""
+    with status_lock:
+        return tuple(service_status.get(key) for key in keys)
+
+# Bytes requested per read of a subprocess pipe (the Linux pipe buffer size)
+PIPE_READ_SIZE = 65536
+
+# Requested capacity of the bridge's stdout pipe (Linux default is 64 KiB), absorbs reader hiccups
+BRIDGE_PIPE_SIZE = 1 << 20
+
+# Lines buffered between the bridge reader and the QR detection consumer
+BRIDGE_LINE_QUEUE_SIZE = 1024
+
+# post_deployment.py limits: output lines kept in memory and total run time
+DEPLOYMENT_OUTPUT_LINES = 2000
+DEPLOYMENT_TIMEOUT_SECONDS = 1800
+
+# Echo raw bridge lines to our stdout (set BRIDGE_ECHO=0 to rely on /logs only)
+BRIDGE_ECHO = os.environ.get("BRIDGE_ECHO", "1") != "0"
+
+# Echoed lines the bridge logger buffers before writing them out in one go
+BRIDGE_LOG_BATCH_LINES = 100
+
+# Lower-case phrases that announce a QR code or an already authenticated session
+QR_PHRASES = ("scan this qr", "qr code", "whatsapp app")
+AUTH_PHRASES = ("logged in", "authenticated", "connected to whatsapp", "session restored")
+PHRASE_MIN_LENGTH = min(map(len, QR_PHRASES + AUTH_PHRASES))
+
+# Give up on the bridge if it has shown neither a QR nor a session after this long
+QR_TIMEOUT_SECONDS = 60
+
+# Light (top, bottom) halves of the half-block characters qrterminal draws the QR with
+QR_HALF_BLOCKS = {" ": (False, False), "▀": (True, False), "▄": (False, True), "█": (True, True)}
+
+# Extra light modules around the SVG QR so scanners see a full quiet zone
+QR_SVG_PADDING = 3
+
+# QR capture states while scanning bridge output
+QR_IDLE, QR_CAPTURING, QR_DONE = range(3)
+
+# Fewest rows a real QR can take: version 1 is 21 modules, drawn two per row with half blocks
+QR_MIN_ROWS = 11
+
+# Block/quadrant characters the bridge uses to draw the QR code
+QR_BLOCK_RE = re.compile('[█▀▄▐▌▆▇▘▝▗▖]')
+
 print("🌐 WEB SERVER STARTING - NOT start.sh!")
 print(f"⏰ Startup time: {time.time()}")
 
+def iter_process_lines(process, idle_timeout=1.0):
+    """Yield a subprocess's output lines without blocking on readline.
+    
+    Used for both the WhatsApp bridge and post_deployment.py.
+    
+    Args:
+        process: Popen object whose stdout is a binary pipe
+        idle_timeout: Seconds to wait for output before yielding an empty string
+        
+    Returns:
+        Iterator of decoded lines (newline kept), or "" when the process was idle
+    """
+    fd = process.stdout.fileno()
+    pending = bytearray()  # Partial last line carried over to the next read
+    
+    with selectors.DefaultSelector() as selector:
+        selector.register(fd, selectors.EVENT_READ)
+        while True:
+            if not selector.select(idle_timeout):
+                if process.poll() is not None:
+                    break
+                yield ""  # Let the caller run its periodic checks
+                continue
+            
+            chunk = os.read(fd, PIPE_READ_SIZE)
+            if not chunk:
+                break  # EOF - process closed its output
+            
+            pending += chunk
+            end = pending.rfind(b"\n")
+            if end < 0:
+                continue
+            complete = pending[:end]
+            del pending[:end + 1]
+            for raw_line in complete.split(b"\n"):
+                yield raw_line.decode("utf-8", errors="replace") + "\n"
+    
+    if pending:
+        yield pending.decode("utf-8", errors="replace")
+
+class BridgeLogHandler(logging.handlers.MemoryHandler):
+    """MemoryHandler that also flushes once its oldest buffered record is max_delay old."""
+    
+    def __init__(self, capacity, target, max_delay=0.1):
+        super().__init__(capacity, flushLevel=logging.ERROR, target=target, flushOnClose=True)
+        self.max_delay = max_delay
+        self.last_flush = time.monotonic()
+    
+    def shouldFlush(self, record):
+        return super().shouldFlush(record) or time.monotonic() - self.last_flush >= self.max_delay
+    
+    def flush(self):
+        """Write every buffered record with a single write and flush on the target stream."""
+        with self.lock:
+            if self.buffer and self.target:
+                stream = self.target.stream
+                stream.write("".join(self.target.format(record) + "\n" for record in self.buffer))
+                stream.flush()
+                self.buffer.clear()
+            self.last_flush = time.monotonic()
+
+# Bridge echo goes through a buffered logger: one stdout write per batch instead of per line
+bridge_log_handler = BridgeLogHandler(BRIDGE_LOG_BATCH_LINES, logging.StreamHandler(sys.stdout))
+bridge_log_handler.target.setFormatter(logging.Formatter("%(message)s"))
+bridge_log = logging.getLogger("bridge")
+bridge_log.addHandler(bridge_log_handler)
+bridge_log.setLevel(logging.INFO)
+bridge_log.propagate = False
+
+def enlarge_pipe(fd, size=BRIDGE_PIPE_SIZE):
+    """Grow a pipe's kernel buffer so its writer doesn't block while we briefly fall behind.
+    
+    Args:
+        fd: File descriptor of either end of the pipe
+        size: Requested capacity in bytes
+    """
+    try:
+        fcntl.fcntl(fd, fcntl.F_SETPIPE_SZ, size)
+    except (AttributeError, OSError) as e:
+        # Not Linux, or above /proc/sys/fs/pipe-max-size: keep the default buffer
+        print(f"⚠️ Could not enlarge bridge pipe: {e}")
+
+def is_qr_row(line):
+    """Check whether a bridge line is part of the block-character QR drawing."""
+    # Plain log lines are ASCII, and str.isascii() is a constant-time flag check
+    return not line.isascii() and QR_BLOCK_RE.search(line) is not None
+
+def put_dropping_oldest(line_queue, item):
+    """Put an item on a bounded queue, discarding the oldest entry if it is full."""
+    while True:
+        try:
+            line_queue.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                line_queue.get_nowait()
+            except queue.Empty:
+                pass
+
+def record_bridge_log(line):
+    """Append a stripped bridge line to the in-memory log served by /logs."""
+    with status_lock:
+        service_status["bridge_logs"].append(line)
+        service_status["bridge_log_total"] += 1
+
+def pump_bridge_output(bridge_process, line_queue, consumer_done):
+    """Reader thread: log raw bridge output and queue it for the consumer, then a None sentinel.
+    
+    The reader is the only writer of the /logs buffer, so lines are kept in
+    order and none are lost when the consumer stops. It keeps draining the
+    pipe after that (QR captured or session authenticated), so the bridge
+    never blocks on a full stdout buffer; it just stops queueing.
+    """
+    try:
+        for line in iter_process_lines(bridge_process):
+            if line:
+                record_bridge_log(line.strip())
+            if not consumer_done.is_set():
+                put_dropping_oldest(line_queue, line)
+    except Exception as e:
+        print(f"Error reading bridge output: {e}")
+    finally:
+        put_dropping_oldest(line_queue, None)
+
+def run_post_deployment():
+    """Run post_deployment.py, streaming its output instead of buffering all of it.
+    
+    Returns:
+        Tuple of (exit code, last DEPLOYMENT_OUTPUT_LINES lines of stdout and stderr)
+        
+    Raises:
+        subprocess.TimeoutExpired: If the flow runs longer than DEPLOYMENT_TIMEOUT_SECONDS
+    """
+    command = ["python3", "/app/post_deployment.py"]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=0)
+    output = collections.deque(maxlen=DEPLOYMENT_OUTPUT_LINES)
+    deadline = time.monotonic() + DEPLOYMENT_TIMEOUT_SECONDS
+    
+    for line in iter_process_lines(process):
+        if line:
+            output.append(line)
+        if time.monotonic() > deadline:
+            process.kill()
+            process.wait()
+            raise subprocess.TimeoutExpired(command, DEPLOYMENT_TIMEOUT_SECONDS)
+    
+    return process.wait(), "".join(output)
+
+def run_deployment_flow():
+    """Run post_deployment.py and record its outcome; the caller claims the flow first."""
+    try:
+        returncode, output = run_post_deployment()
+        
+        if returncode == 0:
+            print("✅ Post-deployment flow completed successfully!")
+            set_deployment_flow_status("completed", output=output)
+        else:
+            print("❌ Post-deployment flow failed!")
+            set_deployment_flow_status("failed", error=output)
+            
+    except Exception as e:
+        print(f"❌ Post-deployment flow exception: {str(e)}")
+        set_deployment_flow_status("error", error=str(e))
+
 def monitor_bridge_logs():
     """Monitor bridge logs for QR codes."""
     try:
@@ -32,234 +333,325 @@ def monitor_bridge_logs():
             ['/app/whatsapp-bridge'],
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
-            universal_newlines=True
+            bufsize=0
         )
         
         service_status["bridge_process"] = bridge_process
+        enlarge_pipe(bridge_process.stdout.fileno())
+        
+        # Reading and log storage happen on their own thread; this one only does detection
+        line_queue = queue.Queue(maxsize=BRIDGE_LINE_QUEUE_SIZE)
+        consumer_done = threading.Event()
+        reader_thread = threading.Thread(target=pump_bridge_output, args=(bridge_process, line_queue, consumer_done), daemon=True)
+        reader_thread.start()
+        service_status["bridge_reader"] = reader_thread
         
         # Monitor output for QR codes
         qr_lines = []
-        capturing_qr = False
+        qr_state = QR_IDLE
         line_count = 0
-        start_time = time.time()
+        qr_deadline = time.monotonic() + QR_TIMEOUT_SECONDS
         
-        while bridge_process.poll() is None:
+        for line in iter(line_queue.get, None):
             try:
-                line = bridge_process.stdout.readline()
-                if line:
+                if not line:
+                    bridge_log_handler.flush()  # Idle tick: don't hold back buffered output
+                else:
                     line_count += 1
-                    service_status["bridge_logs"].append(line.strip())
-                    print(f"Bridge [{line_count}]: {line.strip()}")
+                    stripped = line.strip()
+                    if BRIDGE_ECHO:
+                        bridge_log.info("Bridge [%d]: %s", line_count, stripped)
                     
-                    # More aggressive QR detection
-                    if any(phrase in line.lower() for phrase in ["scan this qr", "qr code", "whatsapp app"]):
+                    # More aggressive QR detection (lines shorter than every phrase can't match)
+                    may_match = len(stripped) >= PHRASE_MIN_LENGTH
+                    line_lower = line.lower() if may_match else ""
+                    if may_match and any(phrase in line_lower for phrase in QR_PHRASES):
+                        bridge_log_handler.flush()
                         print("🔍 QR code section detected!")
-                        capturing_qr = True
+                        qr_state = QR_CAPTURING
                         qr_lines = []
                         continue
                     
                     # Check if already authenticated
-                    if any(phrase in line.lower() for phrase in ["logged in", "authenticated", "connected to whatsapp", "session restored"]):
+                    if may_match and any(phrase in line_lower for phrase in AUTH_PHRASES):
+                        bridge_log_handler.flush()
                         print("✅ WhatsApp already authenticated!")
-                        service_status["qr_code"] = "AUTHENTICATED"
+                        publish_qr_code("AUTHENTICATED")
                         
                         # Auto-trigger deployment flow if not already running
-                        if service_status.get("deployment_flow_status") not in ["running", "completed"]:
+                        if claim_deployment_flow():
                             print("🚀 Auto-triggering post-deployment flow...")
                             try:
-                                def auto_run_deployment_flow():
-                                    try:
-                                        result = subprocess.run(
-                                            ["python3", "/app/post_deployment.py"],
-                                            capture_output=True,
-                                            text=True,
-                                            timeout=1800
-                                        )
-                                        
-                                        if result.returncode == 0:
-                                            print("✅ Auto post-deployment flow completed!")
-                                            service_status["deployment_flow_status"] = "completed"
-                                            service_status["deployment_flow_output"] = result.stdout
-                                        else:
-                                            print("❌ Auto post-deployment flow failed!")
-                                            service_status["deployment_flow_status"] = "failed"
-                                            service_status["deployment_flow_error"] = result.stderr
-                                            
-                                    except Exception as e:
-                                        print(f"❌ Auto deployment flow exception: {str(e)}")
-                                        service_status["deployment_flow_status"] = "error"
-                                        service_status["deployment_flow_error"] = str(e)
-                                
-                                # Start auto deployment flow
-                                auto_thread = threading.Thread(target=auto_run_deployment_flow, daemon=True)
-                                auto_thread.start()
-                                service_status["deployment_flow_status"] = "running"
-                                
+                                threading.Thread(target=run_deployment_flow, daemon=True).start()
                             except Exception as e:
                                 print(f"❌ Failed to auto-trigger deployment flow: {str(e)}")
+                                set_deployment_flow_status("error", error=str(e))
                         
                         break
                     
-                    # Capture QR code lines - even more inclusive
-                    if capturing_qr:
-                        # Check for ANY line with block characters
-                        if any(char in line for char in ['█', '▀', '▄', '▐', '▌', '▆', '▇', '▘', '▝', '▗', '▖']):
+                    # Capture QR code lines: every block-character row until the first row without any
+                    if qr_state == QR_CAPTURING:
+                        if is_qr_row(line):
                             qr_lines.append(line.rstrip())
-                            print(f"📦 QR line captured: {len(qr_lines)} lines so far")
-                        # Also capture lines that start with multiple block chars
-                        elif line.strip().startswith('██') or '████' in line:
-                            qr_lines.append(line.rstrip())
-                            print(f"📦 QR border captured: {len(qr_lines)} lines so far")
-                        # Stop capturing on empty lines or text after QR
-                        elif line.strip() == '' or (line.strip() and not any(char in line for char in ['█', '▀', '▄', '▐', '▌', '▆', '▇', '▘', '▝', '▗', '▖', ' '])):
-                            if qr_lines and len(qr_lines) > 15:  # Lower threshold
-                                service_status["qr_code"] = '\n'.join(qr_lines)
-                                print(f"✅ QR code captured! ({len(qr_lines)} lines)")
-                                print(f"🔍 QR preview: {qr_lines[0][:50]}...")
-                                break  # Stop monitoring once we have a QR
-                            elif qr_lines:
-                                print(f"⚠️ QR too short ({len(qr_lines)} lines), continuing...")
-                            capturing_qr = False
+                            bridge_log.info("📦 QR line captured: %d lines so far", len(qr_lines))
+                        elif qr_lines or stripped:
+                            bridge_log_handler.flush()
+                            if len(qr_lines) >= QR_MIN_ROWS:
+                                qr_state = QR_DONE
+                            else:
+                                if qr_lines:
+                                    print(f"⚠️ QR too short ({len(qr_lines)} lines), continuing...")
+                                qr_state = QR_IDLE
+                    
+                    if qr_state == QR_DONE:
+                        publish_qr_code('\n'.join(qr_lines))
+                        print(f"✅ QR code captured! ({len(qr_lines)} lines)")
+                        print(f"🔍 QR preview: {qr_lines[0][:50]}...")
+                        break  # Stop monitoring once we have a QR
                     
-                # Check for timeout - restart bridge if no QR after 60 seconds
-                if time.time() - start_time > 60 and not service_status.get("qr_code"):
+                # Check for timeout - restart bridge if no QR in time (idle ticks keep this running)
+                if time.monotonic() > qr_deadline and not service_status.get("qr_code"):
+                    bridge_log_handler.flush()
                     print("⏰ Timeout: No QR code detected, restarting bridge...")
                     bridge_process.terminate()
-                    time.sleep(2)
-                    service_status["qr_code"] = None
+                    try:
+                        bridge_process.wait(timeout=2)  # Returns as soon as the bridge is gone
+                    except subprocess.TimeoutExpired:
+                        bridge_process.kill()
+                        bridge_process.wait()
+                    publish_qr_code(None)
                     break  # This will restart the function
                     
             except Exception as e:
+                bridge_log_handler.flush()
                 print(f"Error reading bridge output: {e}")
                 break
+        
+        bridge_log_handler.flush()
+        
+        # Leave the pipe to the reader alone: it keeps draining and logging,
+        # so the bridge never stalls on a full stdout buffer
+        consumer_done.set()
                 
     except Exception as e:
         print(f"❌ Bridge startup error: {e}")
 
+# (second, body) of the last /health response; the body only changes once a second
+_health_cache = (0, b"")
+
 @app.route('/health')
 def health_check():
     """Railway health check endpoint."""
-    return jsonify({
-        "status": "healthy",
-        "web_server": "running",
-        "timestamp": time.time()
-    }), 200
+    global _health_cache
+    now = int(time.time())
+    if _health_cache[0] != now:
+        _health_cache = (now, b'{"status":"healthy","web_server":"running","timestamp":%d}' % now)
+    return Response(_health_cache[1], status=200, mimetype="application/json")
+
+# Public routes listed by the root endpoint
+ENDPOINTS = ("/health", "/qr", "/qr-stream", "/logs", "/qr-debug", "/trigger-deployment-flow", "/deployment-status")
+
+# Encoded / bodies by (bridge running, deployment flow status): only a handful ever exist
+_root_bodies = {}
 
 @app.route('/')
 def root():
     """Root endpoint showing service info."""
-    return jsonify({
-        "service": "WhatsApp Link Forwarder",
-        "status": "running",
-        "endpoints": ["/health", "/qr", "/logs", "/qr-debug", "/trigger-deployment-flow", "/deployment-status"],
-        "bridge_running": service_status["bridge_process"] is not None,
-        "deployment_flow_status": service_status.get("deployment_flow_status", "not_started")
-    })
+    key = (service_status["bridge_process"] is not None, service_status.get("deployment_flow_status", "not_started"))
+    body = _root_bodies.get(key)
+    if body is None:
+        body = _root_bodies[key] = app.json.dumps({
+            "service": "WhatsApp Link Forwarder",
+            "status": "running",
+            "endpoints": ENDPOINTS,
+            "bridge_running": key[0],
+            "deployment_flow_status": key[1]
+        }).encode("utf-8")
+    return Response(body, mimetype="application/json")
 
-@app.route('/qr')
-def qr_display():
-    """Display QR code for WhatsApp authentication."""
-    
-    html_template = """
+# Stylesheet and script for the /qr page, served separately so browsers can cache them
+QR_PAGE_CSS = """
+body { 
+    font-family: Arial, sans-serif; 
+    background: #0a0a0a; 
+    color: white; 
+    margin: 0; 
+    padding: 20px; 
+    text-align: center;
+}
+.container { 
+    max-width: 900px; 
+    margin: 0 auto; 
+    background: #1a1a1a; 
+    border-radius: 15px; 
+    padding: 30px;
+    border: 2px solid #25D366;
+}
+.qr-code { 
+    font-family: 'Courier New', monospace; 
+    font-size: 6px; 
+    line-height: 1.1; 
+    white-space: pre; 
+    background: white; 
+    color: black; 
+    padding: 15px; 
+    border-radius: 8px; 
+    display: inline-block; 
+    margin: 20px 0;
+    max-width: 500px;
+    overflow: visible;
+    border: 3px solid #000;
+    letter-spacing: -0.5px;
+    word-spacing: 0px;
+    font-weight: normal;
+}
+@media (max-width: 768px) {
+    .qr-code {
+        font-size: 4px;
+        line-height: 1.0;
+        max-width: 350px;
+        padding: 10px;
+    }
+}
+@media (min-width: 1200px) {
+    .qr-code {
+        font-size: 8px;
+        line-height: 1.2;
+        max-width: 600px;
+    }
+}
+.status { 
+    background: #25D366; 
+    color: white; 
+    padding: 15px; 
+    border-radius: 8px; 
+    margin: 15px 0;
+    font-size: 18px;
+    font-weight: bold;
+}
+.instructions {
+    background: #2d2d2d;
+    padding: 20px;
+    border-radius: 10px;
+    margin: 20px 0;
+    text-align: left;
+    display: inline-block;
+}
+.refresh-btn {
+    background: #25D366;
+    color: white;
+    border: none;
+    padding: 15px 30px;
+    border-radius: 8px;
+    font-size: 16px;
+    cursor: pointer;
+    margin: 10px;
+    font-weight: bold;
+}
+.refresh-btn:hover { background: #1da851; }
+.waiting {
+    background: #ff9800;
+    color: white;
+    padding: 15px;
+    border-radius: 8px;
+    margin: 15px 0;
+}
+.qr-image {
+    background: white;
+    padding: 10px;
+    border-radius: 8px;
+    display: inline-block;
+    margin: 20px 0;
+}
+.qr-image svg {
+    display: block;
+    width: min(80vw, 360px);
+    height: auto;
+}
+"""
+
+QR_PAGE_JS = r"""
+// Reload when the server pushes a QR change; poll every 10 seconds without EventSource.
+// Start from the QR this page was rendered with, so a change made before the
+// stream connects still triggers a reload on its first event.
+var lastState = null;
+if (window.EventSource) {
+    new EventSource('/qr-stream').onmessage = function(event) {
+        var state = JSON.parse(event.data);
+        if (!lastState) {
+            var tag = document.querySelector('meta[name="qr-tag"]');
+            lastState = {qr: tag ? tag.content : state.qr, deployment: state.deployment};
+        }
+        if (state.qr !== lastState.qr) {
+            location.reload();
+        } else if (state.deployment !== lastState.deployment && document.getElementById('deployment-status')) {
+            checkDeploymentStatus();
+        }
+        lastState = state;
+    };
+} else {
+    setTimeout(function(){ location.reload(); }, 10000);
+}
+
+function triggerDeploymentFlow() {
+    document.getElementById('deployment-status').style.display = 'block';
+    document.getElementById('deployment-output').textContent = '🚀 Starting post-deployment flow...';
+
+    fetch('/trigger-deployment-flow')
+        .then(response => response.json())
+        .then(data => {
+            if (data.status === 'success') {
+                document.getElementById('deployment-output').textContent = '✅ Deployment flow triggered successfully!\n📊 Status updates as the flow progresses...';
+                // Status changes are pushed over /qr-stream; poll only without EventSource
+                if (!window.EventSource) {
+                    setInterval(checkDeploymentStatus, 5000);
+                }
+            } else {
+                document.getElementById('deployment-output').textContent = '❌ Failed to trigger deployment flow: ' + data.message;
+            }
+        })
+        .catch(error => {
+            document.getElementById('deployment-output').textContent = '❌ Error: ' + error.message;
+        });
+}
+
+function checkDeploymentStatus() {
+    fetch('/deployment-status')
+        .then(response => response.json())
+        .then(data => {
+            const statusDiv = document.getElementById('deployment-status');
+            const outputDiv = document.getElementById('deployment-output');
+
+            statusDiv.style.display = 'block';
+
+            let statusText = `📊 Status: ${data.deployment_flow_status}\n`;
+
+            if (data.deployment_flow_output) {
+                statusText += '\n📋 Output:\n' + data.deployment_flow_output;
+            }
+
+            if (data.deployment_flow_error) {
+                statusText += '\n🚨 Error:\n' + data.deployment_flow_error;
+            }
+
+            outputDiv.textContent = statusText;
+        });
+}
+"""
+
+# Changes whenever the CSS or JS does, so the long-lived browser cache is never stale
+QR_ASSET_VERSION = hashlib.sha1((QR_PAGE_CSS + QR_PAGE_JS).encode()).hexdigest()[:12]
+
+QR_PAGE_HTML = """
     <!DOCTYPE html>
     <html>
     <head>
         <title>WhatsApp QR Code</title>
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <style>
-            body { 
-                font-family: Arial, sans-serif; 
-                background: #0a0a0a; 
-                color: white; 
-                margin: 0; 
-                padding: 20px; 
-                text-align: center;
-            }
-            .container { 
-                max-width: 900px; 
-                margin: 0 auto; 
-                background: #1a1a1a; 
-                border-radius: 15px; 
-                padding: 30px;
-                border: 2px solid #25D366;
-            }
-            .qr-code { 
-                font-family: 'Courier New', monospace; 
-                font-size: 6px; 
-                line-height: 1.1; 
-                white-space: pre; 
-                background: white; 
-                color: black; 
-                padding: 15px; 
-                border-radius: 8px; 
-                display: inline-block; 
-                margin: 20px 0;
-                max-width: 500px;
-                overflow: visible;
-                border: 3px solid #000;
-                letter-spacing: -0.5px;
-                word-spacing: 0px;
-                font-weight: normal;
-            }
-            @media (max-width: 768px) {
-                .qr-code {
-                    font-size: 4px;
-                    line-height: 1.0;
-                    max-width: 350px;
-                    padding: 10px;
-                }
-            }
-            @media (min-width: 1200px) {
-                .qr-code {
-                    font-size: 8px;
-                    line-height: 1.2;
-                    max-width: 600px;
-                }
-            }
-            .status { 
-                background: #25D366; 
-                color: white; 
-                padding: 15px; 
-                border-radius: 8px; 
-                margin: 15px 0;
-                font-size: 18px;
-                font-weight: bold;
-            }
-            .instructions {
-                background: #2d2d2d;
-                padding: 20px;
-                border-radius: 10px;
-                margin: 20px 0;
-                text-align: left;
-                display: inline-block;
-            }
-            .refresh-btn {
-                background: #25D366;
-                color: white;
-                border: none;
-                padding: 15px 30px;
-                border-radius: 8px;
-                font-size: 16px;
-                cursor: pointer;
-                margin: 10px;
-                font-weight: bold;
-            }
-            .refresh-btn:hover { background: #1da851; }
-            .waiting {
-                background: #ff9800;
-                color: white;
-                padding: 15px;
-                border-radius: 8px;
-                margin: 15px 0;
-            }
-        </style>
-        <script>
-            // Auto-refresh every 10 seconds
-            setTimeout(function(){ location.reload(); }, 10000);
-        </script>
+        <meta name="qr-tag" content="{{ qr_tag }}">
+        <link rel="stylesheet" href="/static/qr.css?v={{ asset_version }}">
+        <script src="/static/qr.js?v={{ asset_version }}"></script>
     </head>
     <body>
         <div class="container">
@@ -287,53 +679,13 @@ def qr_display():
                         </div>
                     </div>
                     
-                    <script>
-                        function triggerDeploymentFlow() {
-                            document.getElementById('deployment-status').style.display = 'block';
-                            document.getElementById('deployment-output').textContent = '🚀 Starting post-deployment flow...';
-                            
-                            fetch('/trigger-deployment-flow')
-                                .then(response => response.json())
-                                .then(data => {
-                                    if (data.status === 'success') {
-                                        document.getElementById('deployment-output').textContent = '✅ Deployment flow triggered successfully!\n📊 Checking status every 5 seconds...';
-                                        // Start polling for status
-                                        setInterval(checkDeploymentStatus, 5000);
-                                    } else {
-                                        document.getElementById('deployment-output').textContent = '❌ Failed to trigger deployment flow: ' + data.message;
-                                    }
-                                })
-                                .catch(error => {
-                                    document.getElementById('deployment-output').textContent = '❌ Error: ' + error.message;
-                                });
-                        }
-                        
-                        function checkDeploymentStatus() {
-                            fetch('/deployment-status')
-                                .then(response => response.json())
-                                .then(data => {
-                                    const statusDiv = document.getElementById('deployment-status');
-                                    const outputDiv = document.getElementById('deployment-output');
-                                    
-                                    statusDiv.style.display = 'block';
-                                    
-                                    let statusText = `📊 Status: ${data.deployment_flow_status}\n`;
-                                    
-                                    if (data.deployment_flow_output) {
-                                        statusText += '\n📋 Output:\n' + data.deployment_flow_output;
-                                    }
-                                    
-                                    if (data.deployment_flow_error) {
-                                        statusText += '\n🚨 Error:\n' + data.deployment_flow_error;
-                                    }
-                                    
-                                    outputDiv.textContent = statusText;
-                                });
-                        }
-                    </script>
                 {% else %}
                     <div class="status">✅ QR Code Ready - Scan Now!</div>
-                    <div class="qr-code">{{ qr_code|safe }}</div>
+                    {% if qr_svg %}
+                        <div class="qr-image">{{ qr_svg|safe }}</div>
+                    {% else %}
+                        <div class="qr-code">{{ qr_code|safe }}</div>
+                    {% endif %}
                     <div class="instructions">
                         <h3>📱 How to Scan:</h3>
                         <ol>
@@ -353,7 +705,7 @@ def qr_display():
                     <ul>
                         <li>WhatsApp bridge is connecting...</li>
                         <li>QR code will be generated automatically</li>
-                        <li>This page refreshes every 10 seconds</li>
+                        <li>This page updates automatically when the QR code is ready</li>
                     </ul>
                 </div>
             {% endif %}
@@ -362,73 +714,239 @@ def qr_display():
     </body>
     </html>
     """
+
+def qr_page_etag(qr_code):
+    """ETag for the /qr page; the page only changes with the QR state."""
+    return hashlib.sha1((qr_code or "none").encode()).hexdigest()[:16]
+
+# Compiled once at import; open /qr tabs reload only when /qr-stream pushes a change
+QR_PAGE_TEMPLATE = app.jinja_env.from_string(QR_PAGE_HTML, globals={"asset_version": QR_ASSET_VERSION})
+# The "Generating QR Code..." and "Already Authenticated" pages never change,
+# so they are served pre-rendered
+WAITING_PAGE_BYTES = QR_PAGE_TEMPLATE.render(qr_code="", qr_tag=qr_page_etag("")).encode("utf-8")
+AUTHENTICATED_PAGE_BYTES = QR_PAGE_TEMPLATE.render(qr_code="AUTHENTICATED", qr_tag=qr_page_etag("AUTHENTICATED")).encode("utf-8")
+STATIC_QR_PAGES = {None: WAITING_PAGE_BYTES, "": WAITING_PAGE_BYTES, "AUTHENTICATED": AUTHENTICATED_PAGE_BYTES}
+
+def qr_block_art_to_svg(qr_code):
+    """Convert the bridge's half-block QR drawing into an SVG image.
+    
+    Each character is one module wide and two tall; its drawn halves are the
+    light modules (the terminal draws light on dark) and blanks are dark.
+    
+    Args:
+        qr_code: Captured QR rows joined with newlines
+        
+    Returns:
+        SVG markup, or None if the drawing uses characters other than half blocks
+    """
+    lines = qr_code.split("\n")
+    width = max(len(line) for line in lines)
+    
+    modules = []  # Rows of booleans, True for light
+    for line in lines:
+        try:
+            halves = [QR_HALF_BLOCKS[char] for char in line.ljust(width)]
+        except KeyError:
+            return None
+        modules.append([top for top, _ in halves])
+        modules.append([bottom for _, bottom in halves])
+    
+    # Crop the terminal background around the light quiet zone
+    light_rows = [y for y, row in enumerate(modules) if any(row)]
+    light_cols = [x for x in range(width) if any(row[x] for row in modules)]
+    if not light_rows:
+        return None
+    modules = [row[light_cols[0]:light_cols[-1] + 1] for row in modules[light_rows[0]:light_rows[-1] + 1]]
     
-    return render_template_string(
-        html_template, 
-        qr_code=service_status.get("qr_code", "")
+    # One 1-unit-wide stroke per horizontal run of dark modules, positioned relatively
+    path = []
+    for y, row in enumerate(modules):
+        x, pen = 0, None
+        while x < len(row):
+            if row[x]:
+                x += 1
+                continue
+            start = x
+            while x < len(row) and not row[x]:
+                x += 1
+            path.append(f"M{start} {y}.5h{x - start}" if pen is None else f"m{start - pen} 0h{x - start}")
+            pen = x
+    
+    pad = QR_SVG_PADDING
+    view_w, view_h = len(modules[0]) + 2 * pad, len(modules) + 2 * pad
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{-pad} {-pad} {view_w} {view_h}" shape-rendering="crispEdges">'
+        f'<rect x="{-pad}" y="{-pad}" width="{view_w}" height="{view_h}" fill="#fff"/>'
+        f'<path d="{"".join(path)}" stroke="#000"/></svg>'
     )
 
+def render_qr_page(qr_code):
+    """Build the (qr_code, etag, body, gzipped body) entry /qr serves for a QR state."""
+    body = STATIC_QR_PAGES.get(qr_code) or QR_PAGE_TEMPLATE.render(
+        qr_code=qr_code, qr_tag=qr_page_etag(qr_code), qr_svg=qr_block_art_to_svg(qr_code)
+    ).encode("utf-8")
+    return (qr_code, qr_page_etag(qr_code), body, gzip.compress(body, compresslevel=6))
+
+# (qr_code, etag, body, gzipped body) of the last rendered page, swapped as one
+# tuple so server threads never see a mismatched etag and body
+_qr_page = render_qr_page(None)
+
+def publish_qr_code(qr_code):
+    """Store a new QR state, rendering its page once here rather than on the next /qr hit."""
+    global _qr_page
+    page = render_qr_page(qr_code)
+    with status_lock:
+        service_status["qr_code"] = qr_code
+        _qr_page = page
+    notify_status_change()
+
+def send_precompressed(body, gzipped_body, etag, mimetype, cache_control):
+    """Send pre-encoded bytes, gzipped when the client accepts it, with 304s on a matching ETag.
+    
+    Args:
+        body: Uncompressed response bytes
+        gzipped_body: The same bytes compressed once with gzip
+        etag: Validator for the uncompressed representation
+        mimetype: Response content type
+        cache_control: Cache-Control header value
+        
+    Returns:
+        Flask response object
+    """
+    use_gzip = request.accept_encodings["gzip"] > 0  # Quality 0 means "not acceptable"
+    if use_gzip:
+        etag += "-gz"  # Each encoding is a distinct representation
+    
+    if request.if_none_match.contains(etag):
+        response = make_response("", 304)
+    else:
+        response = make_response(gzipped_body if use_gzip else body)
+        response.mimetype = mimetype
+        if use_gzip:
+            response.headers["Content-Encoding"] = "gzip"
+    
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    response.vary.add("Accept-Encoding")
+    return response
+
+QR_PAGE_CSS_BYTES = QR_PAGE_CSS.encode("utf-8")
+QR_PAGE_JS_BYTES = QR_PAGE_JS.encode("utf-8")
+QR_PAGE_CSS_GZIP = gzip.compress(QR_PAGE_CSS_BYTES, compresslevel=9)
+QR_PAGE_JS_GZIP = gzip.compress(QR_PAGE_JS_BYTES, compresslevel=9)
+
+# Asset URLs change with their content, so they can be cached for a day
+ASSET_CACHE_CONTROL = "public, max-age=86400, immutable"
+
+@app.route('/static/qr.css')
+def qr_css():
+    """Stylesheet for the /qr page."""
+    return send_precompressed(QR_PAGE_CSS_BYTES, QR_PAGE_CSS_GZIP, QR_ASSET_VERSION, "text/css", ASSET_CACHE_CONTROL)
+
+@app.route('/static/qr.js')
+def qr_js():
+    """Client script for the /qr page (live updates and deployment controls)."""
+    return send_precompressed(QR_PAGE_JS_BYTES, QR_PAGE_JS_GZIP, QR_ASSET_VERSION, "application/javascript", ASSET_CACHE_CONTROL)
+
+@app.route('/qr')
+def qr_display():
+    """Display QR code for WhatsApp authentication."""
+    # _qr_page is the single source of truth, rendered by publish_qr_code on every QR change
+    _, etag, body, gzipped_body = _qr_page
+    
+    # Let refreshing tabs revalidate instead of downloading the same page
+    return send_precompressed(body, gzipped_body, etag, "text/html", "no-cache")
+
+@app.route('/qr-stream')
+def qr_stream():
+    """Server-Sent Events stream that pushes QR and deployment status changes."""
+    def events():
+        deadline = time.monotonic() + SSE_MAX_SECONDS
+        seen_version = -1
+        while time.monotonic() < deadline:
+            with status_changed:
+                if seen_version == status_version:
+                    status_changed.wait(SSE_KEEPALIVE_SECONDS)
+                changed = seen_version != status_version
+                seen_version = status_version
+            
+            if changed:
+                state = {
+                    "qr": qr_page_etag(service_status.get("qr_code")),
+                    "deployment": status_snapshot("deployment_flow_status")[0] or "not_started"
+                }
+                yield f"data: {app.json.dumps(state)}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+    
+    return Response(events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+# (cache key, body) of the last /logs response
+_logs_cache = (None, b"")
+
 @app.route('/logs')
 def logs():
     """Show recent bridge logs."""
-    recent_logs = service_status["bridge_logs"][-50:]  # Last 50 lines
-    return jsonify({
-        "logs": recent_logs,
-        "total_lines": len(service_status["bridge_logs"]),
-        "bridge_running": service_status["bridge_process"] is not None
-    })
+    global _logs_cache
+    
+    # Copy under the lock: iterating a deque while the monitor appends raises RuntimeError
+    with status_lock:
+        key = (service_status["bridge_log_total"], service_status["bridge_process"] is not None)
+        cached_key, body = _logs_cache
+        if cached_key != key:
+            recent_logs = list(itertools.islice(reversed(service_status["bridge_logs"]), LOGS_TAIL_LINES))[::-1]
+    
+    # Re-serialize only when new lines arrived since the last call
+    if cached_key != key:
+        body = app.json.dumps({
+            "logs": recent_logs,
+            "total_lines": key[0],
+            "bridge_running": key[1]
+        }).encode("utf-8")
+        _logs_cache = (key, body)
+    return Response(body, mimetype="application/json")
+
+# (QR page tuple, body) of the last /qr-debug response; publish_qr_code swaps the tuple
+_qr_debug_cache = (None, b"")
 
 @app.route('/qr-debug')
 def qr_debug():
     """Debug endpoint to show raw QR code data."""
-    qr_data = service_status.get("qr_code", "")
-    return jsonify({
-        "qr_code_present": bool(qr_data),
-        "qr_code_length": len(qr_data),
-        "qr_code_lines": qr_data.count('\n') + 1 if qr_data else 0,
-        "qr_code_preview": qr_data[:200] + "..." if len(qr_data) > 200 else qr_data,
-        "qr_code_raw": qr_data
-    })
+    global _qr_debug_cache
+    
+    page = _qr_page
+    if _qr_debug_cache[0] is not page:
+        qr_data = page[0] or ""
+        length = len(qr_data)
+        body = app.json.dumps({
+            "qr_code_present": bool(qr_data),
+            "qr_code_length": length,
+            "qr_code_lines": qr_data.count('\n') + 1 if qr_data else 0,
+            "qr_code_preview": qr_data[:200] + "..." if length > 200 else qr_data,
+            "qr_code_raw": qr_data
+        }).encode("utf-8")
+        _qr_debug_cache = (page, body)
+    
+    return Response(_qr_debug_cache[1], mimetype="application/json")
 
 @app.route('/trigger-deployment-flow')
 def trigger_deployment_flow():
     """Trigger the post-deployment testing flow."""
     try:
-        print("🚀 Triggering post-deployment flow...")
-        
-        # Run post-deployment script in background
-        import subprocess
-        import threading
+        # Single flight: a second trigger while the flow runs doesn't start another one
+        if not claim_deployment_flow(allow_rerun=True):
+            return jsonify({
+                "status": "success",
+                "message": "Post-deployment flow already running",
+                "deployment_status": "running"
+            })
         
-        def run_deployment_flow():
-            try:
-                result = subprocess.run(
-                    ["python3", "/app/post_deployment.py"],
-                    capture_output=True,
-                    text=True,
-                    timeout=1800  # 30 minute timeout
-                )
-                
-                if result.returncode == 0:
-                    print("✅ Post-deployment flow completed successfully!")
-                    service_status["deployment_flow_status"] = "completed"
-                    service_status["deployment_flow_output"] = result.stdout
-                else:
-                    print("❌ Post-deployment flow failed!")
-                    service_status["deployment_flow_status"] = "failed"
-                    service_status["deployment_flow_error"] = result.stderr
-                    
-            except Exception as e:
-                print(f"❌ Post-deployment flow exception: {str(e)}")
-                service_status["deployment_flow_status"] = "error"
-                service_status["deployment_flow_error"] = str(e)
+        print("🚀 Triggering post-deployment flow...")
         
-        # Start deployment flow in background
+        # Run post-deployment script in background (already marked running, so a fast finish isn't overwritten)
         deployment_thread = threading.Thread(target=run_deployment_flow, daemon=True)
         deployment_thread.start()
         
-        service_status["deployment_flow_status"] = "running"
-        
         return jsonify({
             "status": "success",
             "message": "Post-deployment flow triggered",
@@ -436,27 +954,45 @@ def trigger_deployment_flow():
         })
         
     except Exception as e:
+        set_deployment_flow_status("error", error=str(e))
         return jsonify({
             "status": "error",
             "message": f"Failed to trigger deployment flow: {str(e)}"
         }), 500
 
+# (cache key, body) of the last /deployment-status response
+_deployment_status_cache = (None, b"")
+
 @app.route('/deployment-status')
 def deployment_status():
     """Check the status of the post-deployment flow."""
-    return jsonify({
-        "deployment_flow_status": service_status.get("deployment_flow_status", "not_started"),
-        "deployment_flow_output": service_status.get("deployment_flow_output", ""),
-        "deployment_flow_error": service_status.get("deployment_flow_error", ""),
-        "bridge_running": service_status["bridge_process"] is not None,
-        "qr_code_present": bool(service_status.get("qr_code"))
-    })
+    global _deployment_status_cache
+    
+    # Every QR or deployment change bumps status_version; the bridge starting doesn't, so key on it too
+    key = (status_version, service_status["bridge_process"] is not None)
+    if _deployment_status_cache[0] != key:
+        flow_status, flow_output, flow_error, qr_code = status_snapshot(
+            "deployment_flow_status", "deployment_flow_output", "deployment_flow_error", "qr_code"
+        )
+        body = app.json.dumps({
+            "deployment_flow_status": flow_status or "not_started",
+            "deployment_flow_output": flow_output or "",
+            "deployment_flow_error": flow_error or "",
+            "bridge_running": key[1],
+            "qr_code_present": bool(qr_code)
+        }).encode("utf-8")
+        _deployment_status_cache = (key, body)
+    
+    return Response(_deployment_status_cache[1], mimetype="application/json")
 
 def signal_handler(signum, frame):
     """Handle shutdown signals."""
     print(f"🛑 Received signal {signum}, shutting down...")
     if service_status["bridge_process"]:
         service_status["bridge_process"].terminate()
+    if service_status["bridge_reader"]:
+        service_status["bridge_reader"].join(timeout=2)  # Reader exits on the pipe's EOF
+    bridge_log_handler.flush()  # Don't lose the last batch of echoed bridge lines
     sys.exit(0)
 
 if __name__ == '__main__':
@@ -473,4 +1009,11 @@ if __name__ == '__main__':
     # Start web server immediately
     port = int(os.environ.get('PORT', 8000))
     print(f"🚀 Web server starting on port {port}")
-    app.run(host='0.0.0.0', port=port, debug=False) 
\ No newline at end of file
+    try:
+        from waitress import serve
+    except ImportError:
+        print("⚠️  waitress not installed, falling back to the Flask development server")
+        app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
+    else:
+        threads = int(os.environ.get('WEB_THREADS', 32))  # Each open /qr tab holds one for its event stream
+        serve(app, host='0.0.0.0', port=port, threads=threads, connection_limit=200) 
\ No newline at end of file
@@ -931,6 +931,85 @@ func startRESTServer(client *whatsmeow.Client, messageStore *MessageStore, port
 		json.NewEncoder(w).Encode(response)
 	}).Methods("POST")
 
+	// Group Management - Remove Participants from several groups in one request
+	router.HandleFunc("/api/group/participants/remove_bulk", func(w http.ResponseWriter, r *http.Request) {
+		var req struct {
+			Operations []struct {
+				GroupJID     string   `json:"group_jid"`
+				Participants []string `json:"participants"`
+			} `json:"operations"`
+		}
+
+		if err := json.NewDecoder(r.Body).Decode(&req); err != nil {
+			logger.Errorf("Invalid request format: %v", err)
+			writeJSONError(w, "Invalid request format", http.StatusBadRequest)
+			return
+		}
+
+		if len(req.Operations) == 0 {
+			logger.Errorf("No operations specified for bulk removal")
+			writeJSONError(w, "No operations specified", http.StatusBadRequest)
+			return
+		}
+
+		logger.Infof("Received bulk request to remove participants from %d groups", len(req.Operations))
+
+		// Run each group's removal and report per-group results
+		results := make([]map[string]interface{}, 0, len(req.Operations))
+		allSucceeded := true
+		for _, op := range req.Operations {
+			result := map[string]interface{}{
+				"group_jid": op.GroupJID,
+				"success":   false,
+			}
+			results = append(results, result)
+
+			jid, err := types.ParseJID(op.GroupJID)
+			if err != nil {
+				logger.Errorf("Invalid group JID %s: %v", op.GroupJID, err)
+				result["error"] = "Invalid group JID"
+				allSucceeded = false
+				continue
+			}
+
+			var participantJIDs []types.JID
+			var validParticipants []string
+			for _, participant := range op.Participants {
+				pJID, err := types.ParseJID(participant)
+				if err != nil {
+					logger.Warnf("Invalid participant JID %s: %v", participant, err)
+					continue
+				}
+				participantJIDs = append(participantJIDs, pJID)
+				validParticipants = append(validParticipants, participant)
+			}
+
+			if len(participantJIDs) == 0 {
+				logger.Errorf("No valid participant JIDs found for group %s", op.GroupJID)
+				result["error"] = "No valid participants"
+				allSucceeded = false
+				continue
+			}
+
+			_, err = client.UpdateGroupParticipants(jid, participantJIDs, whatsmeow.ParticipantChangeRemove)
+			if err != nil {
+				logger.Errorf("Failed to remove participants from group %s: %v", op.GroupJID, err)
+				result["error"] = fmt.Sprintf("Failed to remove participants: %v", err)
+				allSucceeded = false
+				continue
+			}
+
+			logger.Infof("Successfully removed %d participants from group %s", len(participantJIDs), op.GroupJID)
+			result["success"] = true
+			result["removed_participants"] = validParticipants
+		}
+
+		writeJSONResponse(w, map[string]interface{}{
+			"success": allSucceeded,
+			"results": results,
+		})
+	}).Methods("POST")
+
 	logger.Infof("Starting REST server on port %d", port)
 	// Use the router instead of the default http.ServeMux
 	err := http.ListenAndServe(fmt.Sprintf(":%d", port), router)